@@ -1,135 +1,409 @@
 import streamlit as st
 import pandas as pd
-import folium
 from streamlit_folium import st_folium
-from folium.plugins import MarkerCluster
 from dotenv import load_dotenv
 import os
 import json
-import snowflake.connector
-import cloudinary
-import cloudinary.uploader
+from collections import Counter
+from datetime import datetime, timezone
+from feedback_cache import TTLCache
+from feedback_queue import FeedbackWriteQueue
+from gallery import (
+    build_image_manifest, index_image_manifest, load_image_manifest,
+    normalize_city_name, thumbnail_path, write_image_manifest
+)
+from geo_index import CityGridIndex, ZoomClusters, in_viewport
+from heritage_data import build_art_form_index, load_heritage_dataset, select_art_forms
+from map_builder import (
+    add_popup_html, build_base_map, build_heritage_map, build_trivia_map, build_viewport_layer, resolve_render_mode
+)
+from perf import (
+    PROCESS, PerfRegistry, bind_registry, configure as configure_perf, count, export_prometheus, span, track_view
+)
+from rollup import CATEGORY_COLUMNS, RATING_COLUMNS
+from search import build_search_index
+from storage import create_feedback_store, create_image_store
+from uploads import upload_images
 load_dotenv(dotenv_path=r"C:\Users\AARUSHI TANDON\OneDrive\Python\snowflake_hackathon\.env") 
 
-# Cloudinary config using env variables
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET"),
-    secure=True
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ---------------- Storage Backends ----------------
+# FEEDBACK_BACKEND=snowflake|sqlite and IMAGE_STORE=cloudinary|local; sqlite + local run fully offline
+FEEDBACK_BACKEND = os.getenv("FEEDBACK_BACKEND", "snowflake")
+IMAGE_STORE = os.getenv("IMAGE_STORE", "cloudinary")
+SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH", os.path.join(APP_DIR, ".local_feedback.sqlite3"))
+LOCAL_IMAGE_DIR = os.getenv("LOCAL_IMAGE_DIR", os.path.join(APP_DIR, ".local_uploads"))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", os.getenv("SNOWFLAKE_POOL_SIZE", "4")))
+DB_MAX_RETRIES = int(os.getenv("DB_MAX_RETRIES", os.getenv("SNOWFLAKE_MAX_RETRIES", "3")))
+DB_QUERY_TIMEOUT = int(os.getenv("DB_QUERY_TIMEOUT", os.getenv("SNOWFLAKE_QUERY_TIMEOUT", "30")))
+
+UPLOAD_MAX_EDGE = int(os.getenv("UPLOAD_MAX_EDGE", "1600"))
+UPLOAD_JPEG_QUALITY = int(os.getenv("UPLOAD_JPEG_QUALITY", "85"))
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))
+UPLOAD_TIMEOUT = int(os.getenv("UPLOAD_TIMEOUT", "30"))
+
+# ---------------- Performance Instrumentation ----------------
+# Spans are always aggregated in memory; PERF_LOG_SPANS / PERF_PROMETHEUS_PATH add optional sinks
+PERF_LOG_SPANS = os.getenv("PERF_LOG_SPANS", "0") == "1"
+PERF_PROMETHEUS_PATH = os.getenv("PERF_PROMETHEUS_PATH")
+PERF_PROMETHEUS_INTERVAL = float(os.getenv("PERF_PROMETHEUS_INTERVAL", "15"))
+# The performance panel in the admin dashboard is hidden unless enabled here or with ?perf=1
+PERF_PANEL = os.getenv("PERF_PANEL", "0") == "1"
+configure_perf(
+    log_spans=PERF_LOG_SPANS,
+    prometheus_path=PERF_PROMETHEUS_PATH,
+    prometheus_interval=PERF_PROMETHEUS_INTERVAL
 )
 
 @st.cache_resource(show_spinner=False)
-def get_snowflake_connection():
-    return snowflake.connector.connect(
-        user=os.getenv("SNOWFLAKE_USER"),
-        password=os.getenv("SNOWFLAKE_PASSWORD"),
-        account=os.getenv("SNOWFLAKE_ACCOUNT"),
-        warehouse=os.getenv("SNOWFLAKE_WAREHOUSE"),
-        database=os.getenv("SNOWFLAKE_DATABASE"),
-        schema=os.getenv("SNOWFLAKE_SCHEMA")
+def get_feedback_store():
+    return create_feedback_store(
+        FEEDBACK_BACKEND,
+        sqlite_path=SQLITE_DB_PATH,
+        pool_size=DB_POOL_SIZE,
+        max_retries=DB_MAX_RETRIES,
+        query_timeout=DB_QUERY_TIMEOUT
     )
+
+@st.cache_resource(show_spinner=False)
+def get_image_store():
+    return create_image_store(IMAGE_STORE, local_root=LOCAL_IMAGE_DIR)
+
 # ---------------- Streamlit Config ----------------
 st.set_page_config(page_title="India's Living Heritage", layout="wide")
 st.title("🇮🇳 India’s Living Heritage")
 st.markdown("Celebrate India's cultural diversity — explore heritage cities, timeless art forms, and sustainable tourism tips.")
 
+# Spans finished during this rerun also land in the session's own histograms
+bind_registry(st.session_state.setdefault("perf_registry", PerfRegistry()))
+
+# ---------------- Cultural Trivia ----------------
+did_you_know_dict = {
+    "Pattadakal": "Where kings were crowned — a blend of North and South Indian temple styles.",
+    "Aihole": "Known as the cradle of Indian architecture with 120+ temples.",
+    "Lepakshi": "Has a hanging pillar that defies gravity!",
+    "Srirangam": "The largest functioning Hindu temple complex in the world.",
+    "Melkote": "A Bhakti movement stronghold rich in Iyengar traditions.",
+    "Chanderi": "Famed for handwoven sarees once exported to royal courts.",
+    "Kalna": "Home to 108 Shiva temples arranged in two concentric circles.",
+    "Kushinagar": "Believed to be the place where Buddha attained Nirvana.",
+    "Shekhawati": "Called the open art gallery of Rajasthan for its painted havelis.",
+    "Kangra": "Origin of the delicate Kangra miniature painting style.",
+    "Deogarh (Jharkhand)": "Major pilgrimage site during the Shravani Mela.",
+    "Baripada": "Its Rath Yatra is pulled by women — a rare tradition!",
+    "Dharanikota": "Capital of Satavahanas and ancient Buddhist hub.",
+    "Bishnupur": "Famous for terracotta temples and Baluchari sarees.",
+    "Lonar": "Crater lake formed by a meteor impact — both saline and alkaline.",
+    "Dholavira": "Had water systems 4500 years ago — from the Harappan era!",
+    "Rani ki Vav": "Stepwell built as an inverted temple dedicated to water.",
+    "Champaner-Pavagadh": "India’s only preserved pre-Mughal Islamic city.",
+    "Bateshwar": "200+ temples scattered across ravines — now being restored.",
+    "Mandu": "City of Joy — romantic ruins and Afghan architecture.",
+    "Ziro": "Apatani tribe’s home — known for eco-living and nose plugs.",
+    "Unakoti": "Rock carvings of Shiva — literally ‘one less than a crore’.",
+    "Tawang": "India’s largest monastery — second in the world.",
+    "Karaikal": "Home of Karaikal Ammaiyar, one of the first female Shaiva saints.",
+    "Narsinghgarh": "Picturesque palace-fort overlooking a scenic lake."
+}
+
 # ---------------- Load CSV ----------------
-@st.cache_data(show_spinner=False)
+HERITAGE_CSV_PATH = os.getenv("HERITAGE_CSV_PATH", r"C:\Users\AARUSHI TANDON\Downloads\India_Authentic_Heritage_Cities.csv")
+HERITAGE_DATA_CACHE_DIR = os.getenv("HERITAGE_DATA_CACHE_DIR", os.path.join(APP_DIR, ".data_cache"))
+
+@st.cache_resource(show_spinner=False)
 def load_heritage_data():
-    csv_path = r"C:\Users\AARUSHI TANDON\Downloads\India_Authentic_Heritage_Cities.csv"
-    return pd.read_csv(csv_path)
+    # Shared read-only frame (categorical city/art form, float32 coordinates) backed by a Parquet copy of the CSV,
+    # plus the escaped popup/tooltip HTML and trivia columns both maps read
+    return add_popup_html(load_heritage_dataset(HERITAGE_CSV_PATH, HERITAGE_DATA_CACHE_DIR), did_you_know_dict)
+
+@st.cache_resource(show_spinner=False)
+def get_art_form_index():
+    return build_art_form_index(load_heritage_data())
+
+@st.cache_resource(show_spinner=False)
+def get_city_index():
+    return CityGridIndex(load_heritage_data())
 
-df = load_heritage_data()
+def art_form_key(art_forms):
+    return tuple(sorted(art_forms))
+
+def filter_by_art_forms(art_forms_key):
+    return select_art_forms(load_heritage_data(), get_art_form_index(), art_forms_key)
 
 # ---------------- Sidebar Filters ----------------
 st.sidebar.header("Filter by Art Form")
-selected_art_forms = st.sidebar.multiselect("Select one or more art forms:", df["Art Forms / Culture"].unique())
-filtered_df = df[df["Art Forms / Culture"].isin(selected_art_forms)] if selected_art_forms else df
+selected_art_forms = st.sidebar.multiselect("Select one or more art forms:", list(get_art_form_index()))
+filtered_df = filter_by_art_forms(art_form_key(selected_art_forms))
+
+# ---------------- Maps ----------------
+# Built fresh every rerun: st_folium renders into the map it is given, so a shared map would grow on each
+# rerun and change st_folium's component key (dropping marker clicks). What is cached is the immutable
+# input — the dataset with its prebuilt popup HTML and the art-form index — so a build only wraps markers.
+# "markers", "fast" (FastMarkerCluster), "auto" (fast above FAST_MARKER_THRESHOLD cities)
+# or "viewport" (heritage map sends only the current view; the trivia map then behaves as "auto")
+MAP_RENDER_MODE = os.getenv("MAP_RENDER_MODE", "auto")
+FAST_MARKER_THRESHOLD = int(os.getenv("FAST_MARKER_THRESHOLD", "1000"))
+
+def get_heritage_map(art_forms_key):
+    count("map_build")
+    data = filter_by_art_forms(art_forms_key)
+    mode = resolve_render_mode(MAP_RENDER_MODE, len(data), FAST_MARKER_THRESHOLD)
+    with span("map.build_heritage", rows=len(data)):
+        return build_heritage_map(data, mode=mode)
+
+def get_trivia_map(art_forms_key):
+    count("map_build")
+    data = filter_by_art_forms(art_forms_key)
+    mode = resolve_render_mode(
+        "auto" if MAP_RENDER_MODE == "viewport" else MAP_RENDER_MODE, len(data), FAST_MARKER_THRESHOLD
+    )
+    with span("map.build_trivia", rows=len(data)):
+        return build_trivia_map(data, did_you_know_dict, mode=mode)
+
+# Viewport mode: per-zoom cluster bubbles below VIEWPORT_POINT_ZOOM, the individual in-view
+# cities from there on (falling back to the finest clusters above VIEWPORT_MAX_POINTS)
+VIEWPORT_POINT_ZOOM = int(os.getenv("VIEWPORT_POINT_ZOOM", "10"))
+VIEWPORT_MAX_POINTS = int(os.getenv("VIEWPORT_MAX_POINTS", "500"))
+VIEWPORT_MAP_KEY = "heritage_viewport_map"
+
+@st.cache_resource(show_spinner=False)
+def get_zoom_clusters():
+    # Cluster assignment for every zoom level, once per dataset; filters and review stats are applied per view
+    with span("map.zoom_clusters") as fields:
+        clusters = ZoomClusters(load_heritage_data(), max_zoom=VIEWPORT_POINT_ZOOM - 1)
+        fields["rows"] = len(clusters.index)
+    return clusters
+
+def get_viewport_layer(art_forms_key, zoom, bounds):
+    count("map_build")
+    data = filter_by_art_forms(art_forms_key)
+    with span("map.viewport_layer") as fields:
+        if zoom >= VIEWPORT_POINT_ZOOM:
+            points = data[in_viewport(data["Latitude"], data["Longitude"], bounds)]
+            if len(points) <= VIEWPORT_MAX_POINTS:
+                fields["rows"] = len(points)
+                return build_viewport_layer(points)
+
+        zoom_clusters = get_zoom_clusters()
+        try:
+            stats = zoom_clusters.review_stats(get_city_rollup())
+        except Exception:
+            # Clusters still render without review numbers if the feedback store is unreachable
+            stats = None
+        clusters = zoom_clusters.aggregate(zoom, labels=data.index, stats=stats)
+        clusters = clusters[in_viewport(clusters["Latitude"], clusters["Longitude"], bounds)]
+        # A one-city cluster is just that city's regular marker
+        single = clusters["cities"] == 1
+        points = load_heritage_data().iloc[clusters.loc[single, "position"]]
+        fields["rows"] = len(clusters)
+        return build_viewport_layer(points, clusters[~single])
+
+# ---------------- Gallery Helpers ----------------
+THUMBNAIL_CACHE_DIR = os.getenv("THUMBNAIL_CACHE_DIR", os.path.join(APP_DIR, ".thumbnails"))
+THUMBNAIL_MAX_EDGE = int(os.getenv("THUMBNAIL_MAX_EDGE", "400"))
+IMAGE_ROOT_DIR = os.getenv("HERITAGE_IMAGE_DIR", os.path.join(APP_DIR, "assets", "images"))
+IMAGE_MANIFEST_PATH = os.getenv("IMAGE_MANIFEST_PATH", os.path.join(APP_DIR, "assets", "image_manifest.json"))
+
+@st.cache_resource(show_spinner=False)
+def get_image_manifest():
+    # Built by `python gallery.py`; generated on first start if it doesn't exist yet
+    manifest = load_image_manifest(IMAGE_MANIFEST_PATH)
+    if manifest is None:
+        manifest = build_image_manifest(IMAGE_ROOT_DIR, load_heritage_data()["Heritage Cities"].unique())
+        # Without an image folder every city shows "coming soon"; don't persist that past its creation
+        if os.path.isdir(IMAGE_ROOT_DIR):
+            try:
+                write_image_manifest(manifest, IMAGE_MANIFEST_PATH)
+            except OSError:
+                pass
+    return index_image_manifest(manifest)
+
+@st.cache_data(show_spinner=False)
+def get_city_gallery(city_name):
+    # Returns (full_path, thumbnail_path) pairs, or None when the city has no folder;
+    # the thumbnail is None for images a stale manifest lists but that have been deleted since
+    entry = get_image_manifest().get(normalize_city_name(city_name))
+    if entry is None:
+        return None
+    folder = os.path.join(IMAGE_ROOT_DIR, entry["folder"])
+    gallery = []
+    for image in entry["images"]:
+        image_path = os.path.join(folder, image["file"])
+        if not os.path.exists(image_path):
+            gallery.append((image_path, None))
+            continue
+        try:
+            thumb = thumbnail_path(image_path, image["mtime_ns"], THUMBNAIL_CACHE_DIR, THUMBNAIL_MAX_EDGE)
+        except Exception:
+            thumb = image_path
+        gallery.append((image_path, thumb))
+    return gallery
 
 # ---------------- Feedback DB Helpers ----------------
-def save_feedback_to_snowflake(city, name, review, image_urls, rating=None, category=None):
-    conn = get_snowflake_connection()
+FEEDBACK_CACHE_TTL = int(os.getenv("FEEDBACK_CACHE_TTL", "300"))
+FEEDBACK_CACHE_SIZE = int(os.getenv("FEEDBACK_CACHE_SIZE", "256"))
+REVIEW_PAGE_SIZE = int(os.getenv("REVIEW_PAGE_SIZE", "10"))
+
+FEEDBACK_BATCH_SIZE = int(os.getenv("FEEDBACK_BATCH_SIZE", "50"))
+FEEDBACK_FLUSH_INTERVAL = float(os.getenv("FEEDBACK_FLUSH_INTERVAL", "5"))
+FEEDBACK_SPOOL_PATH = os.getenv("FEEDBACK_SPOOL_PATH", os.path.join(APP_DIR, ".feedback_spool.sqlite3"))
+
+@st.cache_resource(show_spinner=False)
+def get_feedback_cache():
+    # Shared across sessions; every flushed batch invalidates the cached pages of the cities it wrote to
+    return TTLCache(ttl=FEEDBACK_CACHE_TTL, max_entries=FEEDBACK_CACHE_SIZE)
+
+ROLLUP_CACHE_TTL = int(os.getenv("ROLLUP_CACHE_TTL", "60"))
+
+@st.cache_resource(show_spinner=False)
+def ensure_feedback_schema():
+    # Creates the per-city rollup (and local tables) once per process, backfilling the rollup if empty
+    get_feedback_store().ensure_schema()
+    return True
+
+@st.cache_resource(show_spinner=False)
+def get_feedback_queue():
+    # Needs nothing but the local spool, so submissions are kept even while the warehouse is down;
+    # schema setup and the search index happen on the flush thread, whose retry loop absorbs failures
+    cache = get_feedback_cache()
+
+    def write_batch(rows):
+        ensure_feedback_schema()
+        # Built (from the warehouse) before the insert, so the new rows are only added once
+        try:
+            search_index = get_search_index()
+        except Exception:
+            # Not built yet; when it is, it reads these rows from the warehouse
+            search_index = None
+        get_feedback_store().insert_feedback(rows)
+        if search_index is not None:
+            for city, name, review, *_ in rows:
+                search_index.add("review", city, review, title=f"{name} on {city}")
+
+    def on_written(rows):
+        # Once the rows have left the spool, so the next page read picks them up from the store.
+        # A read can still see a row in both places; see without_stored
+        for city in {row[0] for row in rows}:
+            cache.invalidate(city)
+
+    return FeedbackWriteQueue(
+        write_batch,
+        FEEDBACK_SPOOL_PATH,
+        batch_size=FEEDBACK_BATCH_SIZE,
+        flush_interval=FEEDBACK_FLUSH_INTERVAL,
+        on_written=on_written
+    )
+
+def save_feedback(city, name, review, image_urls, rating=None, category=None):
+    image_urls_json = json.dumps(image_urls) if image_urls else '[]'
+    # Stamp the submission time now so buffering doesn't reorder reviews; UTC, converted by the store
+    created_on = datetime.now(timezone.utc).isoformat(sep=" ")
     try:
-        cursor = conn.cursor()
-        image_urls_json = json.dumps(image_urls) if image_urls else '[]'
-        insert_sql = """
-            INSERT INTO user_feedback (city, name, review, image_urls, rating, category)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """
-        cursor.execute(insert_sql, (city, name, review, image_urls_json, rating, category))
-        conn.commit()
+        get_feedback_queue().put((city, name, review, image_urls_json, rating, category, created_on))
         st.success("Feedback saved successfully!")
     except Exception as e:
         st.error(f"Error saving feedback: {e}")
-    finally:
-        cursor.close()
 
-def get_feedback_from_snowflake(city):
-    conn = get_snowflake_connection()
+def get_pending_feedback(city):
+    # Reviews still waiting in the write-behind spool, so a submission shows up on the very next rerun
     try:
-        cursor = conn.cursor()
-        select_sql = """
-            SELECT name, review, image_urls, rating, category
-            FROM user_feedback
-            WHERE city = %s
-            ORDER BY created_on DESC
-        """
-        cursor.execute(select_sql, (city,))
-        rows = cursor.fetchall()
-        feedback_list = []
-        for name, review, image_urls_str, rating, category in rows:
-            try:
-                images = json.loads(image_urls_str) if image_urls_str else []
-            except Exception:
-                images = []
-            feedback_list.append({
-                "name": name,
-                "review": review,
-                "images": images,
-                "rating": rating,
-                "category": category
-            })
-        return feedback_list
+        rows = get_feedback_queue().pending_rows(city)
+    except Exception:
+        return []
+    feedback_list = []
+    for _, name, review, image_urls_str, rating, category, _ in rows:
+        try:
+            images = json.loads(image_urls_str) if image_urls_str else []
+        except Exception:
+            images = []
+        feedback_list.append({"name": name, "review": review, "images": images, "rating": rating, "category": category})
+    return feedback_list
+
+def feedback_identity(fb):
+    return fb["name"], fb["review"], tuple(fb["images"]), fb["rating"], fb["category"]
+
+def without_stored(pending, stored):
+    # The spool is read before the store, so a batch flushed in between shows up in both reads;
+    # drop one pending review per identical stored one (identical resubmissions still all show)
+    remaining = Counter(feedback_identity(fb) for fb in stored)
+    kept = []
+    for fb in pending:
+        identity = feedback_identity(fb)
+        if remaining[identity]:
+            remaining[identity] -= 1
+        else:
+            kept.append(fb)
+    return kept
+
+@st.cache_data(show_spinner=False, ttl=ROLLUP_CACHE_TTL)
+def get_city_rollup():
+    ensure_feedback_schema()
+    return pd.DataFrame(get_feedback_store().fetch_city_rollup())
+
+def load_feedback_page(city, page_size, after):
+    # The local backend creates its tables here; nothing may have been flushed yet on a fresh database
+    ensure_feedback_schema()
+    return get_feedback_store().fetch_feedback(city, page_size, after)
+
+def get_feedback(city, page_size=REVIEW_PAGE_SIZE, after=None):
+    try:
+        return get_feedback_cache().get_or_load(
+            (city, page_size, after),
+            lambda: load_feedback_page(city, page_size, after),
+            group=city
+        )
     except Exception as e:
         st.error(f"Error loading feedback: {e}")
-        return []
-    finally:
-        cursor.close()
+        return [], None
 
-# ---------------- Tabs ----------------
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
-    " Heritage Map & Feedback",
-    "Did you know??",
-    "🗓️ Cultural Calendar", 
-    " Responsible Tourism", 
-    " Admin Dashboard",
-    "Heritage Trivia Quiz"
-])
+# ---------------- Search ----------------
+SEARCH_REVIEW_LIMIT = int(os.getenv("SEARCH_REVIEW_LIMIT", "50000"))
+SEARCH_RESULT_LIMIT = 10
 
+@st.cache_resource(show_spinner=False)
+def get_search_index():
+    # One warehouse read when the index is first built; saved feedback is added incrementally afterwards.
+    # A failed read raises, so nothing is cached and the next caller tries again.
+    ensure_feedback_schema()
+    reviews = get_feedback_store().fetch_recent_reviews(SEARCH_REVIEW_LIMIT)
+    with span("search.build_index") as fields:
+        index = build_search_index(load_heritage_data(), did_you_know_dict, reviews)
+        fields["rows"] = len(index)
+    return index
 
-with tab1:
+@st.cache_resource(show_spinner=False)
+def get_catalogue_search_index():
+    # Cities and trivia only: what the sidebar searches while the warehouse is unreachable
+    return build_search_index(load_heritage_data(), did_you_know_dict, [])
+
+def get_sidebar_search_index():
+    try:
+        return get_search_index()
+    except Exception:
+        return get_catalogue_search_index()
+
+# ---------------- Views ----------------
+def render_map_view():
     st.subheader("Cultural Heritage Map of India")
 
-    folium_map = folium.Map(location=[22.0, 79.0], zoom_start=5)
-    cluster = MarkerCluster().add_to(folium_map)
-
-    for _, row in filtered_df.iterrows():
-        popup_html = f"""
-        <div style="width:200px;">
-            <b>{row['Heritage Cities']}</b><br>
-            <i>{row['Art Forms / Culture']}</i><br><br>
-            <b>Tips:</b><br>{row['Tourism Tips']}
-        </div>
-        """
-        folium.Marker(
-            location=[row["Latitude"], row["Longitude"]],
-            popup=folium.Popup(popup_html, max_width=250),
-            tooltip=row['Heritage Cities'],  
-            icon=folium.Icon(color="red", icon="info-sign")
-        ).add_to(cluster)
-
-    map_data = st_folium(folium_map, width=1000, height=600)
+    if MAP_RENDER_MODE == "viewport":
+        # The bounds/zoom st_folium reported on the last pan or zoom (nothing before the first one)
+        viewport = st.session_state.get(VIEWPORT_MAP_KEY) or {}
+        layer = get_viewport_layer(art_form_key(selected_art_forms), viewport.get("zoom") or 5, viewport.get("bounds"))
+        count("map_render")
+        with span("map.st_folium"):
+            # A fresh (cheap) base map every rerun: st_folium attaches the feature group to the map it is
+            # given, so a shared map would accumulate layers, change its JS hash and remount each time
+            map_data = st_folium(
+                build_base_map(), width=1000, height=600, key=VIEWPORT_MAP_KEY, feature_group_to_add=layer
+            )
+    else:
+        folium_map = get_heritage_map(art_form_key(selected_art_forms))
+
+        count("map_render")
+        with span("map.st_folium"):
+            map_data = st_folium(folium_map, width=1000, height=600)
 
     st.markdown("### 🔍 Selected City Details")
     selected_city_row = None
@@ -139,11 +413,10 @@ with tab1:
         clicked_lat = map_data["last_object_clicked"]["lat"]
         clicked_lon = map_data["last_object_clicked"]["lng"]
 
-        # Find city by matching coordinates with tolerance
-        for _, row in filtered_df.iterrows():
-            if abs(row["Latitude"] - clicked_lat) < 0.001 and abs(row["Longitude"] - clicked_lon) < 0.001:
-                selected_city_row = row
-                break
+        # Resolve the clicked marker through the spatial index, restricted to the filtered cities
+        city_label = get_city_index().nearest(clicked_lat, clicked_lon, allowed=filtered_df.index)
+        if city_label is not None:
+            selected_city_row = filtered_df.loc[city_label]
 
     if selected_city_row is not None:
         city_name = selected_city_row["Heritage Cities"]
@@ -154,28 +427,33 @@ with tab1:
         st.info(f" **Tourism Tip:** {selected_city_row['Tourism Tips']}")
 
         # ---------------- Local Gallery ----------------
-        image_root_dir = r"C:\Users\AARUSHI TANDON\OneDrive\Python\snowflake_hackathon\assets\images"
-        city_folder_path = os.path.join(image_root_dir, city_key)
+        gallery = get_city_gallery(city_name)
 
-        if os.path.exists(city_folder_path):
-            image_files = sorted([
-                f for f in os.listdir(city_folder_path)
-                if f.lower().endswith((".jpg", ".jpeg", ".png"))
-            ])
-            if image_files:
-                st.markdown("#### Cultural Gallery (Static Images)")
-                cols = st.columns(3)
-                for idx, img_file in enumerate(image_files):
-                    image_path = os.path.join(city_folder_path, img_file)
-                    if os.path.exists(image_path):
-                        with cols[idx % 3]:
-                            st.image(image_path, use_container_width=True)
-                    else:
-                        st.warning(f" Could not find: {img_file}")
-            else:
-                st.warning("No images found in the local gallery folder!")
-        else:
+        if gallery is None:
             st.info(" Local images gallery coming soon or use Cloudinary!")
+        elif gallery:
+            st.markdown("#### Cultural Gallery (Static Images)")
+            cols = st.columns(3)
+            for idx, (image_path, thumb) in enumerate(gallery):
+                with cols[idx % 3]:
+                    # The gallery is cached, so also catch photos removed after it was listed
+                    if thumb is None or not os.path.exists(image_path):
+                        st.warning(f" Could not find: {os.path.basename(image_path)}")
+                        continue
+                    st.image(thumb, use_container_width=True)
+                    st.button(
+                        "🔍 View full size",
+                        key=f"gallery_full_{city_key}_{idx}",
+                        on_click=st.session_state.__setitem__,
+                        args=("gallery_full_image", image_path)
+                    )
+            # Full-resolution photos are only sent once explicitly requested
+            full_image = st.session_state.get("gallery_full_image")
+            if full_image in dict(gallery) and os.path.exists(full_image):
+                st.image(full_image, use_container_width=True)
+                st.button("Close full size", on_click=st.session_state.pop, args=("gallery_full_image", None))
+        else:
+            st.warning("No images found in the local gallery folder!")
 
         # ---------------- Feedback Form ----------------
         st.markdown("##  Share Your Experience")
@@ -204,17 +482,18 @@ with tab1:
                 else:
                     with st.spinner("Submitting your feedback..."):
 
-                        uploaded_urls = []
-                        for uploaded_file in uploaded_files:
-                            try:
-                                result = cloudinary.uploader.upload(
-                                    uploaded_file,
-                                    folder=f"heritage_feedback/{city_key}")
-                                uploaded_urls.append(result["secure_url"])
-                            except Exception as e:
-                                st.error(f"❌ Failed to upload {uploaded_file.name}: {e}")
-
-                    save_feedback_to_snowflake(
+                        uploaded_urls, failed_uploads = upload_images(
+                            [(f.name, f.getvalue()) for f in uploaded_files or []],
+                            get_image_store().uploader(f"heritage_feedback/{city_key}"),
+                            max_edge=UPLOAD_MAX_EDGE,
+                            quality=UPLOAD_JPEG_QUALITY,
+                            max_workers=UPLOAD_WORKERS,
+                            timeout=UPLOAD_TIMEOUT
+                        )
+                        for file_name, error in failed_uploads:
+                            st.error(f"❌ Failed to upload {file_name}: {error}")
+
+                    save_feedback(
                         city=city_name,
                         name=name_input.strip() if name_input.strip() else "Anonymous",
                         review=review_input.strip(),
@@ -226,7 +505,18 @@ with tab1:
 
         # ---------------- Display Feedback ----------------
         st.markdown(f"###  Reviews for {city_name}")
-        feedbacks = get_feedback_from_snowflake(city_name)
+        # How many review pages this session has loaded; each page starts after the one just fetched,
+        # so reviews arriving in between shift the pages instead of falling into a gap
+        review_pages = st.session_state.setdefault("review_pages", {})
+        pending = get_pending_feedback(city_name)
+        feedbacks, next_after = [], None
+        for _ in range(review_pages.get(city_name, 1)):
+            page, next_after = get_feedback(city_name, after=next_after)
+            feedbacks.extend(page)
+            if next_after is None:
+                break
+        # Still-spooled reviews go first: they are newer than anything already stored
+        feedbacks = without_stored(pending, feedbacks) + feedbacks
 
         if feedbacks:
             for fb in feedbacks:
@@ -245,72 +535,34 @@ with tab1:
                             except Exception:
                                 st.error(f"❌ Could not load image: {img_url}")
                 st.markdown("---")
+            if next_after is not None:
+                st.button(
+                    "Load more reviews",
+                    key=f"load_more_{city_name}",
+                    on_click=review_pages.__setitem__,
+                    args=(city_name, review_pages.get(city_name, 1) + 1)
+                )
         else:
             st.info("No reviews yet. Be the first to share your experience!")
 
     else:
         st.info("🔎 Click on a map marker to view cultural details and contribute your thoughts.")
 
-with tab2:
+def render_trivia_view():
     st.subheader("🤯 Did You Know? | Cultural Trivia Map")
 
-    trivia_map = folium.Map(location=[22.0, 79.0], zoom_start=5, control_scale=True)
-    trivia_cluster = MarkerCluster().add_to(trivia_map)
-
-    did_you_know_dict = {
-        "Pattadakal": "Where kings were crowned — a blend of North and South Indian temple styles.",
-        "Aihole": "Known as the cradle of Indian architecture with 120+ temples.",
-        "Lepakshi": "Has a hanging pillar that defies gravity!",
-        "Srirangam": "The largest functioning Hindu temple complex in the world.",
-        "Melkote": "A Bhakti movement stronghold rich in Iyengar traditions.",
-        "Chanderi": "Famed for handwoven sarees once exported to royal courts.",
-        "Kalna": "Home to 108 Shiva temples arranged in two concentric circles.",
-        "Kushinagar": "Believed to be the place where Buddha attained Nirvana.",
-        "Shekhawati": "Called the open art gallery of Rajasthan for its painted havelis.",
-        "Kangra": "Origin of the delicate Kangra miniature painting style.",
-        "Deogarh (Jharkhand)": "Major pilgrimage site during the Shravani Mela.",
-        "Baripada": "Its Rath Yatra is pulled by women — a rare tradition!",
-        "Dharanikota": "Capital of Satavahanas and ancient Buddhist hub.",
-        "Bishnupur": "Famous for terracotta temples and Baluchari sarees.",
-        "Lonar": "Crater lake formed by a meteor impact — both saline and alkaline.",
-        "Dholavira": "Had water systems 4500 years ago — from the Harappan era!",
-        "Rani ki Vav": "Stepwell built as an inverted temple dedicated to water.",
-        "Champaner-Pavagadh": "India’s only preserved pre-Mughal Islamic city.",
-        "Bateshwar": "200+ temples scattered across ravines — now being restored.",
-        "Mandu": "City of Joy — romantic ruins and Afghan architecture.",
-        "Ziro": "Apatani tribe’s home — known for eco-living and nose plugs.",
-        "Unakoti": "Rock carvings of Shiva — literally ‘one less than a crore’.",
-        "Tawang": "India’s largest monastery — second in the world.",
-        "Karaikal": "Home of Karaikal Ammaiyar, one of the first female Shaiva saints.",
-        "Narsinghgarh": "Picturesque palace-fort overlooking a scenic lake."
-    }
+    trivia_map = get_trivia_map(art_form_key(selected_art_forms))
 
-    # Add markers
-    for _, row in filtered_df.iterrows():
-        city = row['Heritage Cities']
-        if city in did_you_know_dict:
-            trivia_text = did_you_know_dict[city]
-            popup_html = f"""
-            <div style="width:200px;">
-                <b>{city}</b><br><br>
-                <i>Did you know?</i><br>
-                {trivia_text}
-            </div>
-            """
-            folium.Marker(
-                location=[row["Latitude"], row["Longitude"]],
-                popup=folium.Popup(popup_html, max_width=250),
-                icon=folium.Icon(color="green", icon="info-sign")
-            ).add_to(trivia_cluster)
-
-    st_folium(trivia_map, width=1000, height=500)
+    count("map_render")
+    with span("map.st_folium"):
+        st_folium(trivia_map, width=1000, height=500)
 
     st.markdown("### 📜 Cultural Nuggets")
     for city, trivia in did_you_know_dict.items():
         st.markdown(f"**{city}**: {trivia}")
 
 
-with tab3:
+def render_calendar_view():
     st.markdown("**Cultural Calendar: Month-wise Festivals & Events**")
     st.markdown("Discover festivals and cultural events in the 25 heritage cities, organized by month:")
 
@@ -384,7 +636,7 @@ with tab3:
     for event in events_list:
         st.write(f"- {event}")
 
-with tab4:
+def render_tourism_view():
     st.subheader("Travel Kindly: Responsible Tourism Tips 🌍")
 
 
@@ -423,24 +675,20 @@ with tab4:
 
 
     st.info("🤝 These tips are based on UNESCO guidelines and the Ministry of Tourism's 'Dekho Apna Desh' initiative.")
-with tab5:
+def render_admin_view():
     st.subheader("📈 Admin Analytics: Feedback Insights")
 
 
-    conn = get_snowflake_connection()
     try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT
-                city,
-                COUNT(*) AS total_reviews,
-                ROUND(AVG(rating), 2) AS avg_rating
-            FROM user_feedback
-            GROUP BY city
-            ORDER BY total_reviews DESC
-        """)
-        results = cursor.fetchall()
-        analytics_df = pd.DataFrame(results, columns=["City", "Total Reviews", "Avg Rating"])
+        rollup_df = get_city_rollup()
+        if rollup_df.empty:
+            analytics_df = pd.DataFrame(columns=["City", "Total Reviews", "Avg Rating"])
+        else:
+            analytics_df = pd.DataFrame({
+                "City": rollup_df["city"],
+                "Total Reviews": rollup_df["total_reviews"],
+                "Avg Rating": (rollup_df["rating_sum"] / rollup_df["rating_count"].where(rollup_df["rating_count"] > 0)).round(2)
+            })
 
 
         if analytics_df.empty:
@@ -463,13 +711,41 @@ with tab5:
                 st.success("All cities rated 3+ on average!")
 
 
+            st.markdown("### Rating & Category Breakdown")
+            breakdown_df = rollup_df.set_index("city")[RATING_COLUMNS + list(CATEGORY_COLUMNS.values()) + ["last_updated"]]
+            breakdown_df.columns = [f"{stars}⭐" for stars in range(1, 6)] + list(CATEGORY_COLUMNS) + ["Last Updated"]
+            st.dataframe(breakdown_df, use_container_width=True)
+
+
     except Exception as e:
         st.error(f"Failed to fetch analytics: {e}")
-    finally:
-        cursor.close()
+
+    if PERF_PANEL or st.query_params.get("perf") == "1":
+        render_perf_panel()
+
+
+def render_perf_panel():
+    st.markdown("### ⏱️ Performance")
+    st.caption("Span latency histograms (p50/p95 estimated from buckets), with rows and payload bytes per span.")
+    session_tab, process_tab = st.tabs(["This session", "All sessions (this process)"])
+    for tab, registry in ((session_tab, st.session_state["perf_registry"]), (process_tab, PROCESS)):
+        with tab:
+            summary = registry.summary()
+            if not summary:
+                st.info("No spans recorded yet.")
+                continue
+            summary_df = pd.DataFrame(summary).set_index("span")
+            st.dataframe(summary_df, use_container_width=True)
+            st.bar_chart(summary_df["p95_ms"])
+    st.download_button(
+        "Download Prometheus metrics",
+        PROCESS.prometheus_text(),
+        file_name="heritage_metrics.prom",
+        mime="text/plain"
+    )
 
 
-with tab6:
+def render_quiz_view():
     # your trivia quiz code here
     st.header("Test your knowledge! 🇮🇳")
 
@@ -520,5 +796,49 @@ with tab6:
                 # Reset for replay
                 st.session_state.trivia_index = 0
                 st.session_state.score = 0
+# ---------------- Navigation ----------------
+# Only the selected view runs, so e.g. a quiz answer rerun never builds a map or queries Snowflake.
+VIEWS = {
+    " Heritage Map & Feedback": render_map_view,
+    "Did you know??": render_trivia_view,
+    "🗓️ Cultural Calendar": render_calendar_view,
+    " Responsible Tourism": render_tourism_view,
+    " Admin Dashboard": render_admin_view,
+    "Heritage Trivia Quiz": render_quiz_view
+}
+VIEW_TIMING_HISTORY = 20
+
+search_query = st.sidebar.text_input("🔎 Search cities, art forms, trivia & reviews")
+if search_query.strip():
+    search_index = get_sidebar_search_index()
+    with span("search.query") as fields:
+        search_results = search_index.search(search_query, limit=SEARCH_RESULT_LIMIT)
+        fields["rows"] = len(search_results)
+    if search_results:
+        for result in search_results:
+            snippet = result["text"] if len(result["text"]) <= 120 else result["text"][:117] + "..."
+            st.sidebar.markdown(f"**{result['title']}** · _{result['kind']}_  \n{snippet}")
+    else:
+        st.sidebar.info("No matches found.")
+
+active_view = st.radio("Navigate", list(VIEWS), horizontal=True, label_visibility="collapsed", key="active_view")
+with track_view(active_view) as view_timing:
+    VIEWS[active_view]()
+
+view_timings = st.session_state.setdefault("view_timings", [])
+view_timings.append(view_timing)
+del view_timings[:-VIEW_TIMING_HISTORY]
+with st.sidebar.expander("⏱️ View timings"):
+    st.dataframe(pd.DataFrame([
+        {"View": t["view"].strip(), "ms": round(t["seconds"] * 1000, 1), **t["events"]}
+        for t in reversed(view_timings)
+    ]).fillna(0), use_container_width=True)
+
+# No-op unless PERF_PROMETHEUS_PATH is set; throttled to one write per PERF_PROMETHEUS_INTERVAL
+try:
+    export_prometheus()
+except OSError:
+    pass
+
 st.markdown("---")
 st.success("🌟 Built with ❤️ to showcase India’s timeless cultural legacy.")
@@ -0,0 +1,290 @@
+"""Benchmarks for the Streamlit rerun hot paths.
+
+    python benchmarks/bench_app.py
+    python benchmarks/bench_app.py --sizes 25,5000 --reviews 10,10000 --json bench.json
+    python benchmarks/bench_app.py --baseline bench.json --tolerance 0.25
+
+Everything runs offline: a synthetic heritage CSV per catalogue size and a
+local SQLite feedback store (FEEDBACK_BACKEND=sqlite). Each case reports
+p50/p95 latency over ``--repeat`` runs and the peak traced memory of one run.
+With ``--baseline`` the script exits non-zero when a case's p95 is more than
+``--tolerance`` slower than in the baseline file. The end-to-end runs also check
+that identical reruns hand st_folium the same map (same component key), and
+exit non-zero if not.
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from geo_index import CityGridIndex, ZoomClusters, in_viewport  # noqa: E402
+from heritage_data import load_heritage_dataset  # noqa: E402
+from map_builder import add_popup_html, build_base_map, build_heritage_map, build_trivia_map, build_viewport_layer  # noqa: E402
+from storage import create_feedback_store  # noqa: E402
+
+ART_FORMS = [f"Art Form {i}" for i in range(40)]
+CATEGORIES = ["General", "Hospitality", "Art & Culture", "Tourism Tips", "Other"]
+
+
+# ---------------- Synthetic Data ----------------
+def write_synthetic_csv(path, n_rows, seed=7):
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("Heritage Cities,Art Forms / Culture,Tourism Tips,Latitude,Longitude\n")
+        for i in range(n_rows):
+            f.write(
+                f"City {i},{rng.choice(ART_FORMS)},\"Visit early, hire a local guide ({i})\","
+                f"{rng.uniform(8.0, 35.0):.5f},{rng.uniform(68.0, 97.0):.5f}\n"
+            )
+
+
+def seed_feedback(store, city, n_reviews, chunk=5000, seed=11):
+    rng = random.Random(seed)
+    written = 0
+    while written < n_reviews:
+        size = min(chunk, n_reviews - written)
+        store.insert_feedback([
+            (
+                city,
+                f"Traveller {written + i}",
+                "Beautiful temples and friendly artisans. " * 3,
+                json.dumps([f"https://example.invalid/{written + i}.jpg"]),
+                rng.randint(1, 5),
+                rng.choice(CATEGORIES),
+                f"2026-01-01 00:00:00.{written + i:06d}"
+            )
+            for i in range(size)
+        ])
+        written += size
+
+
+# ---------------- Measurement ----------------
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def measure(fn, repeat):
+    fn()  # warm-up (imports, caches, page cache)
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    # Peak memory comes from one separate run so tracing doesn't skew the timings
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "p50_ms": round(_percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(_percentile(samples, 95) * 1000, 3),
+        "peak_mb": round(peak / 1e6, 2),
+    }
+
+
+# ---------------- Cases ----------------
+def bench_catalogue(results, workdir, n_rows, repeat, max_marker_rows):
+    csv_path = os.path.join(workdir, f"heritage_{n_rows}.csv")
+    write_synthetic_csv(csv_path, n_rows)
+    raw = load_heritage_dataset(csv_path, os.path.join(workdir, "data_cache"))
+    trivia = {city: f"Fact about {city}" for city in raw["Heritage Cities"].iloc[::5]}
+    results[f"popup html precompute rows={n_rows}"] = measure(lambda: add_popup_html(raw, trivia), repeat)
+    # As in the app, the maps read popup HTML precomputed once with the dataset
+    df = add_popup_html(raw, trivia)
+
+    modes = ["fast"] + (["markers"] if n_rows <= max_marker_rows else [])
+    for mode in modes:
+        # Building plus rendering to HTML approximates what st_folium pays per rerun
+        results[f"map tab1 build+render [{mode}] rows={n_rows}"] = measure(
+            lambda: build_heritage_map(df, mode=mode).get_root().render(), repeat
+        )
+        results[f"map tab2 build+render [{mode}] rows={n_rows}"] = measure(
+            lambda: build_trivia_map(df, trivia, mode=mode).get_root().render(), repeat
+        )
+
+    # Viewport mode: national view (clusters with review stats) and a zoomed-in view (points)
+    zoom_clusters = ZoomClusters(df)
+    stats = zoom_clusters.review_stats([
+        {"city": city, "total_reviews": 3, "rating_sum": 12, "rating_count": 3} for city in list(trivia)[:500]
+    ])
+    zoomed_in = {"_southWest": {"lat": 20.0, "lng": 75.0}, "_northEast": {"lat": 21.0, "lng": 76.5}}
+
+    def viewport_clusters():
+        clusters = zoom_clusters.aggregate(5, stats=stats)
+        build_viewport_layer(df.iloc[0:0], clusters).add_to(build_base_map()).get_root().render()
+
+    def viewport_points():
+        points = df[in_viewport(df["Latitude"], df["Longitude"], zoomed_in)]
+        build_viewport_layer(points).add_to(build_base_map()).get_root().render()
+
+    results[f"zoom clusters build rows={n_rows}"] = measure(lambda: ZoomClusters(df), repeat)
+    results[f"map tab1 viewport layer [zoom 5] rows={n_rows}"] = measure(viewport_clusters, repeat)
+    results[f"map tab1 viewport layer [zoom 10] rows={n_rows}"] = measure(viewport_points, repeat)
+
+    index = CityGridIndex(df)
+    rng = random.Random(3)
+    picks = [(float(lat), float(lon)) for lat, lon in zip(df["Latitude"], df["Longitude"])]
+    clicks = [rng.choice(picks) for _ in range(1000)]
+
+    def resolve_clicks():
+        for lat, lon in clicks:
+            index.nearest(lat, lon, allowed=df.index)
+
+    results[f"marker click x1000 rows={n_rows}"] = measure(resolve_clicks, repeat)
+    results[f"grid index build rows={n_rows}"] = measure(lambda: CityGridIndex(df), repeat)
+    return csv_path
+
+
+def bench_feedback(results, workdir, review_counts, repeat):
+    store = create_feedback_store("sqlite", sqlite_path=os.path.join(workdir, "feedback.sqlite3"))
+    store.ensure_schema()
+    seeded = 0
+    for n_reviews in sorted(review_counts):
+        city = f"City {n_reviews}"
+        seed_feedback(store, city, n_reviews)
+        seeded += n_reviews
+        results[f"feedback first page reviews={n_reviews}"] = measure(
+            lambda: store.fetch_feedback(city, 10), repeat
+        )
+        _, after = store.fetch_feedback(city, 10)
+        if after is not None:
+            results[f"feedback next page reviews={n_reviews}"] = measure(
+                lambda: store.fetch_feedback(city, 10, after), repeat
+            )
+
+    def raw_aggregate(cursor):
+        cursor.execute("SELECT city, COUNT(*), ROUND(AVG(rating), 2) FROM user_feedback GROUP BY city")
+        return cursor.fetchall()
+
+    results[f"tab5 rollup read rows={seeded}"] = measure(store.fetch_city_rollup, repeat)
+    results[f"tab5 raw GROUP BY rows={seeded}"] = measure(lambda: store.pool.run(raw_aggregate), repeat)
+    return store
+
+
+def _map_component_keys(app):
+    # st_folium's component key ends with a hash of the map's leaflet JS; a change remounts the map
+    # in the browser and drops the click/zoom state the previous rerun reported
+    return [
+        element.proto.id.rsplit("-", 1)[-1]
+        for element in app.main
+        if element.type == "component_instance"
+    ]
+
+
+def check_map_keys_stable(app, view, reruns=3):
+    keys = {tuple(_map_component_keys(app.run())) for _ in range(reruns)}
+    if len(keys) > 1:
+        return [f"{view}: st_folium component key changed across {reruns} identical reruns"]
+    return []
+
+
+def bench_reruns(results, workdir, csv_path, n_rows, repeat):
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    os.environ.update(
+        HERITAGE_CSV_PATH=csv_path,
+        HERITAGE_DATA_CACHE_DIR=os.path.join(workdir, "data_cache"),
+        FEEDBACK_BACKEND="sqlite",
+        IMAGE_STORE="local",
+        SQLITE_DB_PATH=os.path.join(workdir, "feedback.sqlite3"),
+        LOCAL_IMAGE_DIR=os.path.join(workdir, "uploads"),
+        FEEDBACK_SPOOL_PATH=os.path.join(workdir, "spool.sqlite3"),
+        IMAGE_MANIFEST_PATH=os.path.join(workdir, "image_manifest.json"),
+        THUMBNAIL_CACHE_DIR=os.path.join(workdir, "thumbnails"),
+    )
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+    app = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=600)
+    started = time.perf_counter()
+    app.run()
+    results[f"e2e cold start rows={n_rows}"] = {
+        "p50_ms": round((time.perf_counter() - started) * 1000, 3), "p95_ms": None, "peak_mb": None
+    }
+    results[f"e2e rerun map view rows={n_rows}"] = measure(app.run, repeat)
+    failures = check_map_keys_stable(app, f"map view rows={n_rows}")
+
+    views = app.radio(key="active_view")
+    app = views.set_value(views.options[1]).run()
+    failures += check_map_keys_stable(app, f"trivia view rows={n_rows}")
+    app = views.set_value(views.options[-1]).run()
+
+    def answer_quiz():
+        next(box for box in app.text_input if box.label == "Your answer:").input("Bishnupur").run()
+
+    results[f"e2e rerun quiz answer rows={n_rows}"] = measure(answer_quiz, repeat)
+    return failures
+
+
+# ---------------- Reporting ----------------
+def print_report(results):
+    width = max(len(name) for name in results)
+    print(f"{'case':<{width}}  {'p50 ms':>10}  {'p95 ms':>10}  {'peak MB':>8}")
+    for name, stats in results.items():
+        cells = [f"{stats[key]:>10}" if stats[key] is not None else f"{'-':>10}" for key in ("p50_ms", "p95_ms")]
+        peak = f"{stats['peak_mb']:>8}" if stats["peak_mb"] is not None else f"{'-':>8}"
+        print(f"{name:<{width}}  {cells[0]}  {cells[1]}  {peak}")
+
+
+def compare_to_baseline(results, baseline_path, tolerance):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = []
+    for name, stats in results.items():
+        before = baseline.get(name, {}).get("p95_ms")
+        if before and stats["p95_ms"] is not None and stats["p95_ms"] > before * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before} ms -> {stats['p95_ms']} ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the app's rerun hot paths.")
+    parser.add_argument("--sizes", default="25,1000,50000", help="catalogue sizes (rows in the synthetic CSV)")
+    parser.add_argument("--reviews", default="10,1000,100000", help="reviews seeded per benchmarked city")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-marker-rows", type=int, default=5000, help="skip per-marker maps above this size")
+    parser.add_argument("--skip-e2e", action="store_true", help="skip the AppTest end-to-end reruns")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="fail if p95 regresses against this results file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    review_counts = [int(count) for count in args.reviews.split(",")]
+    results = {}
+    failures = []
+    with tempfile.TemporaryDirectory(prefix="heritage-bench-") as workdir:
+        csv_paths = {n_rows: bench_catalogue(results, workdir, n_rows, args.repeat, args.max_marker_rows) for n_rows in sizes}
+        bench_feedback(results, workdir, review_counts, args.repeat)
+        if not args.skip_e2e:
+            for n_rows, csv_path in csv_paths.items():
+                failures += bench_reruns(results, workdir, csv_path, n_rows, args.repeat)
+
+    print_report(results)
+    if failures:
+        print("\nFailed checks:\n  " + "\n  ".join(failures))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    regressions = compare_to_baseline(results, args.baseline, args.tolerance) if args.baseline else []
+    if regressions:
+        print("\nRegressions:\n  " + "\n  ".join(regressions))
+    if failures or regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
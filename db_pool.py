@@ -0,0 +1,128 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from perf import count
+
+
+class ConnectionPool:
+    """Bounded pool of DB-API connections with liveness checks and retries.
+
+    ``connect`` is a zero-argument factory returning a new connection. Errors in
+    ``retry_on`` (narrowed by the optional ``retry_if(exc)`` predicate) are treated
+    as transient: the connection that raised them is dropped instead of being
+    returned to the pool, and ``run`` retries the work on a fresh connection with
+    exponential backoff. Anything else is raised straight away.
+    """
+
+    def __init__(self, connect, size=4, max_retries=3, backoff=0.5, acquire_timeout=30,
+                 health_check_interval=60, retry_on=(Exception,), retry_if=None):
+        self._connect = connect
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.size = size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self.retry_on = retry_on
+        self.retry_if = retry_if
+
+    def is_transient(self, exc):
+        return isinstance(exc, self.retry_on) and (self.retry_if is None or self.retry_if(exc))
+
+    def _retry(self, attempt):
+        for retry in range(self.max_retries + 1):
+            try:
+                return attempt()
+            except self.retry_on as exc:
+                if retry == self.max_retries or not self.is_transient(exc):
+                    raise
+                time.sleep(self.backoff * 2 ** retry)
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_alive(self, conn, last_used):
+        is_closed = getattr(conn, "is_closed", None)
+        if is_closed is not None and is_closed():
+            return False
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        # Idle for a while: the server may have expired the session, so ping it
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _checkout(self):
+        while True:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._retry(self._connect)
+            if self._is_alive(conn, last_used):
+                return conn
+            self._close(conn)
+
+    @contextmanager
+    def connection(self):
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise TimeoutError("Timed out waiting for a free database connection")
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+        except BaseException as exc:
+            if conn is not None and self.is_transient(exc):
+                self._close(conn)
+                conn = None
+            elif conn is not None:
+                # Don't hand the next borrower a half-finished transaction (e.g. after BEGIN + a failed INSERT)
+                try:
+                    conn.rollback()
+                except Exception:
+                    self._close(conn)
+                    conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._idle.put((conn, time.monotonic()))
+            self._slots.release()
+
+    @contextmanager
+    def cursor(self, commit=False):
+        with self.connection() as conn:
+            count("db_query")
+            cursor = conn.cursor()
+            try:
+                yield cursor
+                if commit:
+                    conn.commit()
+            finally:
+                cursor.close()
+
+    def run(self, work):
+        """Run ``work(cursor)`` on a pooled connection, retrying transient failures."""
+        def attempt():
+            with self.cursor() as cursor:
+                return work(cursor)
+        return self._retry(attempt)
+
+    def close_all(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(conn)
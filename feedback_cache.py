@@ -0,0 +1,63 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after ``ttl`` seconds.
+
+    Entries belong to a ``group`` (defaulting to the key itself), e.g. every
+    review page of one city. ``invalidate`` drops a whole group and bumps its
+    version so a load that was already in flight does not write a stale result back.
+    """
+
+    def __init__(self, ttl=300, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at, _ = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key, value, group, version):
+        with self._lock:
+            if self._versions.get(group, 0) != version:
+                return
+            self._entries[key] = (value, time.monotonic() + self.ttl, group)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key, loader, group=None):
+        group = key if group is None else group
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            version = self._versions.get(group, 0)
+        value = loader()
+        self._set(key, value, group, version)
+        return value
+
+    def invalidate(self, group):
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if entry[2] == group]:
+                del self._entries[key]
+            self._versions[group] = self._versions.get(group, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            for _, _, group in self._entries.values():
+                self._versions[group] = self._versions.get(group, 0) + 1
+            self._entries.clear()
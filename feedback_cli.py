@@ -0,0 +1,222 @@
+"""Bulk export/import of the user_feedback table.
+
+    python feedback_cli.py export feedback.ndjson
+    python feedback_cli.py import feedback.parquet --batch-size 2000
+    python feedback_cli.py export feedback.ndjson --sqlite local_feedback.db
+
+Rows are streamed with ``fetchmany`` on export and inserted in chunked
+multi-row batches on import, so memory stays flat regardless of table size.
+Without ``--sqlite`` the Snowflake credentials are read from the environment.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+from rollup import CREATED_ON_SQL
+from storage import create_feedback_store
+
+COLUMNS = ["id", "city", "name", "review", "image_urls", "rating", "category", "created_on"]
+INSERT_COLUMNS = COLUMNS[1:]
+
+
+# ---------------- Connections ----------------
+def open_store(sqlite_path=None):
+    """SQLite when a path is given, otherwise Snowflake configured from the environment."""
+    if sqlite_path:
+        store = create_feedback_store("sqlite", sqlite_path=sqlite_path, pool_size=1)
+    else:
+        load_dotenv()
+        store = create_feedback_store("snowflake", pool_size=1)
+    store.ensure_schema()
+    return store
+
+
+# ---------------- Progress ----------------
+class Progress:
+    """Throttled rows/s progress line on stderr plus a final summary."""
+
+    def __init__(self, label, interval=1.0):
+        self.label = label
+        self.interval = interval
+        self.rows = 0
+        self.started = time.monotonic()
+        self._last_report = self.started
+
+    def add(self, n):
+        self.rows += n
+        now = time.monotonic()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            print(f"\r{self.label}: {self.rows:,} rows ({self.rate():,.0f} rows/s)", end="", file=sys.stderr)
+
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def finish(self, path=None):
+        elapsed = time.monotonic() - self.started
+        size = f", {os.path.getsize(path) / 1e6:,.1f} MB" if path and os.path.exists(path) else ""
+        print(
+            f"\r{self.label}: {self.rows:,} rows in {elapsed:,.1f}s ({self.rate():,.0f} rows/s{size})",
+            file=sys.stderr
+        )
+
+
+# ---------------- Row Conversion ----------------
+def _to_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+def _to_record(row):
+    record = dict(zip(COLUMNS, row))
+    record["created_on"] = _to_datetime(record["created_on"])
+    return record
+
+
+def _parquet_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("id", pa.int64()),
+        ("city", pa.string()),
+        ("name", pa.string()),
+        ("review", pa.string()),
+        ("image_urls", pa.string()),
+        ("rating", pa.int64()),
+        ("category", pa.string()),
+        ("created_on", pa.timestamp("us")),
+    ])
+
+
+# ---------------- Export ----------------
+def stream_rows(conn, batch_size):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT {', '.join(COLUMNS)} FROM user_feedback ORDER BY created_on, id")
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                return
+            yield [_to_record(row) for row in batch]
+    finally:
+        cursor.close()
+
+
+def export_feedback(conn, path, fmt, batch_size):
+    progress = Progress("export")
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = _parquet_schema()
+        with pq.ParquetWriter(path, schema) as writer:
+            for batch in stream_rows(conn, batch_size):
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                progress.add(len(batch))
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            for batch in stream_rows(conn, batch_size):
+                for record in batch:
+                    if record["created_on"] is not None:
+                        record["created_on"] = record["created_on"].isoformat(sep=" ")
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                progress.add(len(batch))
+    progress.finish(path)
+    return progress.rows
+
+
+# ---------------- Import ----------------
+def read_batches(path, fmt, batch_size):
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        for record_batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=INSERT_COLUMNS):
+            yield record_batch.to_pylist()
+        return
+
+    batch = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                batch.append(json.loads(line))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def import_feedback(conn, placeholder, dialect, path, fmt, batch_size):
+    # created_on is converted like the app's own inserts (FeedbackStore.insert_feedback), so UTC
+    # stamps land in the backend's CURRENT_TIMESTAMP form and naive exported values stay as they were
+    values = [placeholder] * (len(INSERT_COLUMNS) - 1) + [CREATED_ON_SQL[dialect].format(placeholder)]
+    insert_sql = f"INSERT INTO user_feedback ({', '.join(INSERT_COLUMNS)}) VALUES ({', '.join(values)})"
+    # Plain inserts (not FeedbackStore.insert_feedback) keep each chunk a single statement;
+    # the rollup is rebuilt once at the end instead of merged per chunk
+    progress = Progress("import")
+    cursor = conn.cursor()
+    try:
+        for batch in read_batches(path, fmt, batch_size):
+            rows = []
+            for record in batch:
+                created_on = _to_datetime(record.get("created_on")) or datetime.now(timezone.utc)
+                rows.append((
+                    record.get("city"),
+                    record.get("name"),
+                    record.get("review"),
+                    record.get("image_urls") or "[]",
+                    record.get("rating"),
+                    record.get("category"),
+                    created_on.isoformat(sep=" ")
+                ))
+            # One multi-row INSERT and commit per chunk
+            cursor.execute("BEGIN")
+            cursor.executemany(insert_sql, rows)
+            conn.commit()
+            progress.add(len(rows))
+    finally:
+        cursor.close()
+    progress.finish()
+    return progress.rows
+
+
+def _format_for(path, fmt):
+    if fmt:
+        return fmt
+    return "parquet" if path.lower().endswith((".parquet", ".pq")) else "ndjson"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or import user_feedback in bulk.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for command, help_text in (("export", "stream the table to a file"), ("import", "bulk-load a file into the table")):
+        sub = subparsers.add_parser(command, help=help_text)
+        sub.add_argument("path")
+        sub.add_argument("--format", choices=["ndjson", "parquet"], help="default: inferred from the file extension")
+        sub.add_argument("--batch-size", type=int, default=5000 if command == "export" else 1000)
+        sub.add_argument("--sqlite", metavar="DB_PATH", help="use a local SQLite database instead of Snowflake")
+    args = parser.parse_args(argv)
+
+    store = open_store(args.sqlite)
+    fmt = _format_for(args.path, args.format)
+    try:
+        with store.pool.connection() as conn:
+            if args.command == "export":
+                export_feedback(conn, args.path, fmt, args.batch_size)
+            else:
+                import_feedback(conn, store.placeholder, store.dialect, args.path, fmt, args.batch_size)
+        if args.command == "import":
+            # Imported rows bypass the app's write path, so recompute the dashboard rollup
+            store.rebuild_rollup()
+    finally:
+        store.pool.close_all()
+
+if __name__ == "__main__":
+    main()
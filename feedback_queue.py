@@ -0,0 +1,145 @@
+import atexit
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class FeedbackWriteQueue:
+    """Write-behind buffer for feedback rows.
+
+    ``put`` appends the row to a local SQLite spool file (so it survives a crash)
+    and returns immediately. A background worker hands the spooled rows to
+    ``write_batch(rows)`` once ``batch_size`` rows are pending or every
+    ``flush_interval`` seconds, and deletes them from the spool only after the
+    write succeeded. Delivery is at-least-once: a crash between the warehouse
+    commit and the spool delete re-sends that batch on the next start.
+
+    Several queues may share one spool file (other server processes, or a new
+    queue after ``st.cache_resource.clear()``): each batch is claimed for
+    ``lease`` seconds in an ``IMMEDIATE`` transaction before it is written, so
+    only one of them sends it. A claim left by a crashed process expires.
+
+    ``on_written(rows)`` runs after a batch has left the spool, the point from
+    which readers should find those rows in the warehouse instead.
+    """
+
+    def __init__(self, write_batch, spool_path, batch_size=50, flush_interval=5.0, retry_delay=10.0, lease=300.0,
+                 on_written=None):
+        self.write_batch = write_batch
+        self.on_written = on_written
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_delay = retry_delay
+        self.lease = lease
+        # Autocommit, so the claim transaction below is an explicit BEGIN IMMEDIATE ... COMMIT
+        self._spool = sqlite3.connect(spool_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._spool.execute("CREATE TABLE IF NOT EXISTS spool (seq INTEGER PRIMARY KEY AUTOINCREMENT, row TEXT NOT NULL)")
+        columns = {info[1] for info in self._spool.execute("PRAGMA table_info(spool)")}
+        if "claimed_by" not in columns:
+            # Spool files from before claims were added
+            self._spool.execute("ALTER TABLE spool ADD COLUMN claimed_by TEXT")
+            self._spool.execute("ALTER TABLE spool ADD COLUMN claimed_until REAL")
+        self._spool_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        # Rows left over from a previous process are picked up by the first flush
+        self._worker = threading.Thread(target=self._run, name="feedback-flush", daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    def put(self, row):
+        with self._spool_lock:
+            self._spool.execute("INSERT INTO spool (row) VALUES (?)", (json.dumps(list(row)),))
+        if self.pending() >= self.batch_size:
+            self._wake.set()
+
+    def pending(self):
+        with self._spool_lock:
+            return self._spool.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+    def pending_rows(self, city):
+        """Spooled rows for ``city`` that haven't left the spool yet, newest first."""
+        with self._spool_lock:
+            rows = self._spool.execute(
+                "SELECT row FROM spool WHERE json_extract(row, '$[0]') = ? ORDER BY seq DESC", (city,)
+            ).fetchall()
+        return [tuple(json.loads(row)) for row, in rows]
+
+    def _claim(self):
+        # Take the oldest unclaimed (or expired) rows for this flush; the IMMEDIATE transaction
+        # stops another queue on the same spool from claiming them at the same time
+        token = uuid.uuid4().hex
+        now = time.time()
+        with self._spool_lock:
+            self._spool.execute("BEGIN IMMEDIATE")
+            try:
+                self._spool.execute(
+                    """
+                    UPDATE spool SET claimed_by = ?, claimed_until = ?
+                    WHERE seq IN (
+                        SELECT seq FROM spool WHERE claimed_until IS NULL OR claimed_until < ?
+                        ORDER BY seq LIMIT ?
+                    )
+                    """,
+                    (token, now + self.lease, now, self.batch_size)
+                )
+                self._spool.execute("COMMIT")
+            except BaseException:
+                self._spool.execute("ROLLBACK")
+                raise
+            batch = self._spool.execute(
+                "SELECT row FROM spool WHERE claimed_by = ? ORDER BY seq", (token,)
+            ).fetchall()
+        return token, [tuple(json.loads(row)) for row, in batch]
+
+    def flush(self):
+        """Write every spooled row in batches; returns the number of rows written."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                token, batch = self._claim()
+                if not batch:
+                    return written
+                try:
+                    self.write_batch(batch)
+                except BaseException:
+                    # Give the rows back so the next attempt (here or in another process) retries them
+                    with self._spool_lock:
+                        self._spool.execute(
+                            "UPDATE spool SET claimed_by = NULL, claimed_until = NULL WHERE claimed_by = ?", (token,)
+                        )
+                    raise
+                with self._spool_lock:
+                    self._spool.execute("DELETE FROM spool WHERE claimed_by = ?", (token,))
+                written += len(batch)
+                if self.on_written is not None:
+                    self.on_written(batch)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Feedback flush failed; rows stay spooled for the next attempt")
+                self._stopped.wait(self.retry_delay)
+
+    def close(self):
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._wake.set()
+        self._worker.join()
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Final feedback flush failed; rows stay spooled until the next start")
+        with self._spool_lock:
+            self._spool.close()
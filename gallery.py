@@ -0,0 +1,145 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import threading
+
+from PIL import Image, ImageOps
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+# ---------------- Directory Listing ----------------
+def list_city_images(folder):
+    """Return sorted ``(path, mtime_ns)`` pairs for the gallery images in ``folder``.
+
+    Returns ``None`` when the folder does not exist.
+    """
+    if not os.path.isdir(folder):
+        return None
+    with os.scandir(folder) as entries:
+        images = [
+            (entry.path, entry.stat().st_mtime_ns)
+            for entry in entries
+            if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS)
+        ]
+    return sorted(images)
+
+
+# ---------------- Thumbnails ----------------
+def thumbnail_path(image_path, mtime_ns, cache_dir, max_edge=400):
+    """Return the on-disk thumbnail for ``image_path``, generating it on first use.
+
+    The cache key covers the absolute path, mtime and size, so editing or
+    replacing a photo produces a fresh thumbnail instead of a stale one.
+    """
+    key = f"{os.path.abspath(image_path)}|{mtime_ns}|{max_edge}"
+    target = os.path.join(cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".jpg")
+    if os.path.exists(target):
+        return target
+
+    os.makedirs(cache_dir, exist_ok=True)
+    with Image.open(image_path) as img:
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        img.thumbnail((max_edge, max_edge))
+        # Write then rename so concurrent sessions never read a half-written file
+        tmp_target = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        img.save(tmp_target, format="JPEG", quality=80, optimize=True)
+    os.replace(tmp_target, target)
+    return target
+
+
+# ---------------- Image Manifest ----------------
+MANIFEST_VERSION = 1
+
+
+def normalize_city_name(name):
+    """Folder/CSV-agnostic key: "Rani Ki Vav", "Deogarh (Jharkhand)" -> "ranikivav", "deogarhjharkhand"."""
+    return re.sub(r"[^a-z0-9]", "", str(name).lower())
+
+
+def build_image_manifest(image_root, city_names=()):
+    """Scan ``image_root`` once and describe every city folder and image in it.
+
+    Folders are keyed by the matching ``Heritage Cities`` value from ``city_names``
+    (compared via ``normalize_city_name``) and fall back to the folder name.
+    Image paths are stored relative to ``image_root``. A missing ``image_root``
+    gives a manifest with no cities.
+    """
+    canonical = {normalize_city_name(name): name for name in city_names}
+    cities = {}
+    if not os.path.isdir(image_root):
+        return {"version": MANIFEST_VERSION, "cities": cities}
+    with os.scandir(image_root) as entries:
+        folders = sorted((entry for entry in entries if entry.is_dir()), key=lambda entry: entry.name)
+    for folder in folders:
+        images = []
+        # A folder removed mid-scan is listed as having no images
+        for image_path, mtime_ns in list_city_images(folder.path) or []:
+            try:
+                with Image.open(image_path) as img:
+                    width, height = img.size
+            except Exception:
+                width = height = None
+            try:
+                size = os.path.getsize(image_path)
+            except OSError:
+                continue
+            images.append({
+                "file": os.path.basename(image_path),
+                "width": width,
+                "height": height,
+                "bytes": size,
+                "mtime_ns": mtime_ns
+            })
+        city = canonical.get(normalize_city_name(folder.name), folder.name)
+        cities[city] = {"folder": folder.name, "images": images}
+    return {"version": MANIFEST_VERSION, "cities": cities}
+
+
+def write_image_manifest(manifest, path):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load_image_manifest(path):
+    """Return the manifest at ``path``, or ``None`` if it is missing or outdated."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == MANIFEST_VERSION else None
+
+
+def index_image_manifest(manifest):
+    """Map normalized city names to their manifest entries for O(1) lookups."""
+    return {normalize_city_name(city): entry for city, entry in manifest["cities"].items()}
+
+
+def _read_city_names(csv_path):
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        return [row["Heritage Cities"] for row in csv.DictReader(f)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the gallery image manifest.")
+    parser.add_argument("--images", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "images"))
+    parser.add_argument("--csv", help="Heritage cities CSV used to name folders after the 'Heritage Cities' column")
+    parser.add_argument("--out", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "image_manifest.json"))
+    args = parser.parse_args()
+
+    city_names = _read_city_names(args.csv) if args.csv else []
+    manifest = build_image_manifest(args.images, city_names)
+    write_image_manifest(manifest, args.out)
+
+    total = sum(len(entry["images"]) for entry in manifest["cities"].values())
+    print(f"Wrote {args.out}: {len(manifest['cities'])} cities, {total} images")
+    if city_names:
+        unmatched = sorted(set(manifest["cities"]) - set(city_names))
+        if unmatched:
+            print(f"Folders without a matching city: {', '.join(unmatched)}")
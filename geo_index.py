@@ -0,0 +1,166 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+
+class CityGridIndex:
+    """Grid-hash over the Latitude/Longitude columns for marker-click lookups.
+
+    Each city is bucketed into a square cell of ``cell_size`` degrees, so a
+    lookup only inspects the handful of cities in the neighbouring cells no
+    matter how large the catalogue is.
+    """
+
+    def __init__(self, df, cell_size=0.05):
+        self.cell_size = cell_size
+        self.cells = {}
+        lats = df["Latitude"].to_numpy(dtype=float)
+        lons = df["Longitude"].to_numpy(dtype=float)
+        for label, lat, lon in zip(df.index, lats, lons):
+            if math.isnan(lat) or math.isnan(lon):
+                continue
+            self.cells.setdefault(self._cell(lat, lon), []).append((lat, lon, label))
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self.cells.values())
+
+    def _cell(self, lat, lon):
+        return math.floor(lat / self.cell_size), math.floor(lon / self.cell_size)
+
+    def nearest(self, lat, lon, tolerance=0.001, allowed=None):
+        """Return the index label of the closest city within ``tolerance`` degrees.
+
+        ``allowed`` restricts the candidates to a set of labels (e.g. the index
+        of the art-form filtered frame). Returns ``None`` when nothing matches.
+        """
+        reach = max(1, math.ceil(tolerance / self.cell_size))
+        row, col = self._cell(lat, lon)
+        best_label, best_dist = None, None
+        for d_row in range(-reach, reach + 1):
+            for d_col in range(-reach, reach + 1):
+                for city_lat, city_lon, label in self.cells.get((row + d_row, col + d_col), ()):
+                    d_lat, d_lon = abs(city_lat - lat), abs(city_lon - lon)
+                    if d_lat >= tolerance or d_lon >= tolerance:
+                        continue
+                    if allowed is not None and label not in allowed:
+                        continue
+                    dist = d_lat * d_lat + d_lon * d_lon
+                    if best_dist is None or dist < best_dist:
+                        best_label, best_dist = label, dist
+        return best_label
+
+
+# ---------------- Viewport Culling ----------------
+def in_viewport(lats, lons, bounds, pad=0.1):
+    """Boolean mask of the points inside Leaflet ``bounds`` grown by ``pad`` of its span on each side.
+
+    ``bounds`` is the ``{"_southWest": {...}, "_northEast": {...}}`` dict st_folium returns;
+    missing bounds (no viewport reported yet) keep every point.
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    corners = (bounds or {}).get("_southWest") or {}, (bounds or {}).get("_northEast") or {}
+    south, west = corners[0].get("lat"), corners[0].get("lng")
+    north, east = corners[1].get("lat"), corners[1].get("lng")
+    if None in (south, west, north, east):
+        return ~(np.isnan(lats) | np.isnan(lons))
+    lat_pad, lon_pad = (north - south) * pad, (east - west) * pad
+    return (
+        (lats >= south - lat_pad) & (lats <= north + lat_pad)
+        & (lons >= west - lon_pad) & (lons <= east + lon_pad)
+    )
+
+
+# ---------------- Zoom-Level Clusters ----------------
+class ZoomClusters:
+    """Grid clusters of the cities for every zoom level, assigned once per dataset.
+
+    At zoom ``z`` a Web Mercator pixel is about ``360 / 256 / 2**z`` degrees, so each
+    level buckets cities into cells roughly ``cell_pixels`` wide on screen. Only the
+    per-row cell labels are stored; ``aggregate`` turns any subset of rows (e.g. an
+    art-form filter) into centroids and review totals with ``np.bincount``.
+    """
+
+    def __init__(self, df, min_zoom=3, max_zoom=9, cell_pixels=80):
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.index = df.index
+        self.lats = df["Latitude"].to_numpy(dtype=float)
+        self.lons = df["Longitude"].to_numpy(dtype=float)
+        # Reviews belong to a city name, which may span several rows (one per art form)
+        self.city_codes, self.cities = pd.factorize(df["Heritage Cities"])
+        valid = ~(np.isnan(self.lats) | np.isnan(self.lons))
+        self.labels = {}
+        self.n_cells = {}
+        for zoom in range(min_zoom, max_zoom + 1):
+            cell_size = 360.0 / 256 / 2 ** zoom * cell_pixels
+            labels = np.full(len(self.lats), -1, dtype=np.int64)
+            if valid.any():
+                rows = np.floor(self.lats[valid] / cell_size).astype(np.int64)
+                cols = np.floor(self.lons[valid] / cell_size).astype(np.int64)
+                rows -= rows.min()
+                cols -= cols.min()
+                # One integer per (row, col) cell, so the unique pass is 1-D
+                _, inverse = np.unique(rows * (cols.max() + 1) + cols, return_inverse=True)
+                labels[valid] = inverse.ravel()
+            self.labels[zoom] = labels
+            self.n_cells[zoom] = int(labels.max()) + 1 if len(labels) else 0
+
+    def review_stats(self, rollup):
+        """Per-city ``(reviews, rating_sum, rating_count)`` arrays from rollup rows (dicts or a DataFrame)."""
+        rollup = pd.DataFrame(rollup)
+        stats = []
+        for column in ("total_reviews", "rating_sum", "rating_count"):
+            if rollup.empty:
+                stats.append(np.zeros(len(self.cities)))
+            else:
+                values = rollup.set_index("city")[column]
+                stats.append(pd.Series(self.cities).map(values).fillna(0).to_numpy(dtype=float))
+        return tuple(stats)
+
+    def aggregate(self, zoom, labels=None, stats=None):
+        """Clusters at ``zoom`` (clamped to the precomputed levels) for the rows with index ``labels``.
+
+        Returns one row per non-empty cluster: centroid ``Latitude``/``Longitude``,
+        ``cities`` (rows in it), ``reviews`` and ``avg_rating`` from ``stats`` (see
+        ``review_stats``; each city counted once per cluster) and ``position``, the
+        row position of one member (the only one for single-city clusters).
+        """
+        level = min(max(int(zoom), self.min_zoom), self.max_zoom)
+        cell_labels = self.labels[level]
+        n_cells = self.n_cells[level]
+        positions = np.arange(len(cell_labels)) if labels is None else self.index.get_indexer(labels)
+        positions = positions[(positions >= 0) & (cell_labels[positions] >= 0)]
+        clusters = cell_labels[positions]
+
+        cities = np.bincount(clusters, minlength=n_cells)
+        lat_sum = np.bincount(clusters, weights=self.lats[positions], minlength=n_cells)
+        lon_sum = np.bincount(clusters, weights=self.lons[positions], minlength=n_cells)
+        member = np.zeros(n_cells, dtype=np.int64)
+        member[clusters] = positions
+
+        reviews = np.zeros(n_cells)
+        rating_sum = np.zeros(n_cells)
+        rating_count = np.zeros(n_cells)
+        if stats is not None:
+            # First row of each (cluster, city) pair carries that city's reviews
+            codes = self.city_codes[positions]
+            named = codes >= 0
+            _, first = np.unique(clusters[named] * len(self.cities) + codes[named], return_index=True)
+            counted_clusters = clusters[named][first]
+            counted_codes = codes[named][first]
+            for total, column in zip((reviews, rating_sum, rating_count), stats):
+                total += np.bincount(counted_clusters, weights=column[counted_codes], minlength=n_cells)
+
+        present = cities > 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            avg_rating = np.where(rating_count > 0, rating_sum / rating_count, np.nan)
+        return pd.DataFrame({
+            "Latitude": lat_sum[present] / cities[present],
+            "Longitude": lon_sum[present] / cities[present],
+            "cities": cities[present],
+            "reviews": reviews[present].astype(np.int64),
+            "avg_rating": np.round(avg_rating[present], 2),
+            "position": member[present],
+        })
@@ -0,0 +1,72 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from perf import timed
+
+try:
+    import pyarrow  # noqa: F401  (pandas' Parquet engine)
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+ART_FORM = "Art Forms / Culture"
+CITY = "Heritage Cities"
+
+HERITAGE_DTYPES = {
+    ART_FORM: "category",
+    CITY: "category",
+    "Latitude": "float32",
+    "Longitude": "float32",
+}
+
+
+# ---------------- Columnar Dataset ----------------
+def _parquet_path(csv_path, cache_dir):
+    # Keyed on the CSV's path, size and mtime so an edited CSV is converted again
+    stat = os.stat(csv_path)
+    key = f"{os.path.abspath(csv_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return os.path.join(cache_dir, f"heritage-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}.parquet")
+
+
+@timed("data.load_heritage", rows=len)
+def load_heritage_dataset(csv_path, cache_dir):
+    """Load the heritage catalogue with typed columns, via a Parquet copy of the CSV.
+
+    The CSV is parsed once and written to ``cache_dir``; later cold starts read the
+    Parquet file instead. Without pyarrow the typed CSV read is used every time.
+    """
+    if not HAS_PARQUET:
+        return pd.read_csv(csv_path, dtype=HERITAGE_DTYPES)
+
+    parquet_path = _parquet_path(csv_path, cache_dir)
+    if os.path.exists(parquet_path):
+        return pd.read_parquet(parquet_path)
+
+    df = pd.read_csv(csv_path, dtype=HERITAGE_DTYPES)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{parquet_path}.{os.getpid()}.tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, parquet_path)
+    return df
+
+
+# ---------------- Art-Form Inverted Index ----------------
+def build_art_form_index(df):
+    """Map each art form to the sorted row positions where it appears."""
+    return {
+        art_form: positions
+        for art_form, positions in df.groupby(ART_FORM, observed=True, sort=False).indices.items()
+    }
+
+
+def select_art_forms(df, art_form_index, art_forms):
+    """Rows for any of ``art_forms`` using the inverted index instead of a full ``isin`` scan."""
+    if not art_forms:
+        return df
+    positions = [art_form_index[art_form] for art_form in art_forms if art_form in art_form_index]
+    if not positions:
+        return df.iloc[0:0]
+    return df.iloc[np.sort(np.concatenate(positions))]
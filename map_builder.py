@@ -0,0 +1,204 @@
+import folium
+import pandas as pd
+from folium.plugins import FastMarkerCluster, MarkerCluster
+
+from perf import timed
+
+MAP_CENTER = [22.0, 79.0]
+
+# "markers" builds one folium.Marker per city, "fast" ships a single data array
+# to FastMarkerCluster and builds markers/popups in the browser, "auto" picks by size.
+# "viewport" (heritage map only) sends just what the current view needs; see build_viewport_layer.
+RENDER_MODES = ("auto", "markers", "fast", "viewport")
+
+
+def resolve_render_mode(mode, n_rows, threshold):
+    if mode not in RENDER_MODES:
+        raise ValueError(f"Unknown map render mode: {mode!r} (expected one of {RENDER_MODES})")
+    if mode == "auto":
+        return "fast" if n_rows > threshold else "markers"
+    return mode
+
+
+def _marker_data(df, columns):
+    # Column-wise conversion to [[lat, lon, ...], ...] with no per-row pandas access
+    data = df.dropna(subset=["Latitude", "Longitude"])
+    data = data[["Latitude", "Longitude"]].astype(float).join(data[columns].fillna("").astype(str))
+    return data.to_numpy().tolist()
+
+
+# ---------------- Popup HTML ----------------
+POPUP_COLUMN = "Popup HTML"
+TOOLTIP_COLUMN = "Tooltip HTML"
+TRIVIA_COLUMN = "Trivia"
+TRIVIA_POPUP_COLUMN = "Trivia Popup HTML"
+# Escaped fields alone: FastMarkerCluster ships these and wraps them in the popup template in
+# the browser, since JSON-encoding the full popup markup roughly doubles the data array
+ART_FORM_HTML_COLUMN = "Art Form HTML"
+TIPS_HTML_COLUMN = "Tips HTML"
+TRIVIA_HTML_COLUMN = "Trivia HTML"
+
+_HTML_ESCAPES = (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"), ("'", "&#x27;"))
+
+
+def escape_html(series):
+    """Vectorized ``html.escape`` of a column; missing values become empty strings."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Escape each distinct value once instead of once per row
+        categories = escape_html(series.cat.categories.to_series().astype(str))
+        return series.cat.rename_categories(categories.to_numpy()).astype(object).fillna("")
+    text = series.astype(object).where(series.notna(), "").astype(str)
+    for char, entity in _HTML_ESCAPES:
+        text = text.str.replace(char, entity, regex=False)
+    return text
+
+
+@timed("map.popup_html", rows=len)
+def add_popup_html(df, trivia):
+    """Return ``df`` plus escaped popup/tooltip HTML for both maps, built column-wise in one pass.
+
+    ``trivia`` (city -> fact) is joined as the ``Trivia`` column; cities without a
+    fact get no trivia popup. The map builders only read these prebuilt strings.
+    """
+    city = escape_html(df["Heritage Cities"])
+    art_form = escape_html(df["Art Forms / Culture"])
+    tips = escape_html(df["Tourism Tips"])
+    trivia_text = df["Heritage Cities"].map(trivia).astype(object)
+    trivia_html = escape_html(trivia_text)
+    return df.assign(**{
+        POPUP_COLUMN: (
+            '<div style="width:200px;"><b>' + city + "</b><br><i>" + art_form
+            + "</i><br><br><b>Tips:</b><br>" + tips + "</div>"
+        ),
+        TOOLTIP_COLUMN: city,
+        ART_FORM_HTML_COLUMN: art_form,
+        TIPS_HTML_COLUMN: tips,
+        TRIVIA_COLUMN: trivia_text,
+        TRIVIA_HTML_COLUMN: trivia_html.where(trivia_text.notna()),
+        TRIVIA_POPUP_COLUMN: (
+            '<div style="width:200px;"><b>' + city + "</b><br><br><i>Did you know?</i><br>" + trivia_html + "</div>"
+        ).where(trivia_text.notna()),
+    })
+
+
+def _with_popup_html(df, trivia=None):
+    # Frames that didn't go through add_popup_html (e.g. ad-hoc callers) get it on the fly
+    if POPUP_COLUMN in df and (trivia is None or TRIVIA_POPUP_COLUMN in df):
+        return df
+    return add_popup_html(df, trivia or {})
+
+
+# Client-side marker factories for FastMarkerCluster; row fields are already HTML-escaped
+_HERITAGE_CALLBACK = """function (row) {
+    var icon = L.AwesomeMarkers.icon({icon: 'info-sign', markerColor: 'red', prefix: 'glyphicon'});
+    var marker = L.marker(new L.LatLng(row[0], row[1]), {icon: icon});
+    marker.bindPopup(
+        '<div style="width:200px;"><b>' + row[2] + '</b><br><i>' + row[3] +
+        '</i><br><br><b>Tips:</b><br>' + row[4] + '</div>',
+        {maxWidth: 250}
+    );
+    marker.bindTooltip(row[2]);
+    return marker;
+}"""
+
+_TRIVIA_CALLBACK = """function (row) {
+    var icon = L.AwesomeMarkers.icon({icon: 'info-sign', markerColor: 'green', prefix: 'glyphicon'});
+    var marker = L.marker(new L.LatLng(row[0], row[1]), {icon: icon});
+    marker.bindPopup(
+        '<div style="width:200px;"><b>' + row[2] + '</b><br><br><i>Did you know?</i><br>' + row[3] + '</div>',
+        {maxWidth: 250}
+    );
+    return marker;
+}"""
+
+
+# ---------------- Heritage Map (tab1) ----------------
+def build_heritage_map(df, mode="markers"):
+    folium_map = folium.Map(location=MAP_CENTER, zoom_start=5)
+    df = _with_popup_html(df)
+
+    if mode == "fast":
+        data = _marker_data(df, [TOOLTIP_COLUMN, ART_FORM_HTML_COLUMN, TIPS_HTML_COLUMN])
+        FastMarkerCluster(data, callback=_HERITAGE_CALLBACK).add_to(folium_map)
+        return folium_map
+
+    cluster = MarkerCluster().add_to(folium_map)
+
+    for lat, lon, popup_html, tooltip_html in zip(df["Latitude"], df["Longitude"], df[POPUP_COLUMN], df[TOOLTIP_COLUMN]):
+        folium.Marker(
+            location=[lat, lon],
+            popup=folium.Popup(popup_html, max_width=250),
+            tooltip=tooltip_html,
+            icon=folium.Icon(color="red", icon="info-sign")
+        ).add_to(cluster)
+
+    return folium_map
+
+
+# ---------------- Viewport Map (tab1) ----------------
+def build_base_map():
+    # Markers are sent separately as a feature group, so the map's JS (and st_folium's component
+    # hash) is the same every rerun and the user's pan/zoom survives; build a new one per call
+    return folium.Map(location=MAP_CENTER, zoom_start=5)
+
+
+def build_viewport_layer(points, clusters=None):
+    """Feature group with a marker per row of ``points`` and a count bubble per row of ``clusters``.
+
+    ``points`` carries the precomputed popup/tooltip HTML; ``clusters`` comes from
+    ``ZoomClusters.aggregate`` (centroid, cities, reviews, avg_rating).
+    """
+    layer = folium.FeatureGroup(name="Heritage cities")
+
+    for lat, lon, popup_html, tooltip_html in zip(
+        points["Latitude"], points["Longitude"], points[POPUP_COLUMN], points[TOOLTIP_COLUMN]
+    ):
+        folium.Marker(
+            location=[lat, lon],
+            popup=folium.Popup(popup_html, max_width=250),
+            tooltip=tooltip_html,
+            icon=folium.Icon(color="red", icon="info-sign")
+        ).add_to(layer)
+
+    if clusters is not None:
+        for lat, lon, cities, reviews, avg_rating in zip(
+            clusters["Latitude"], clusters["Longitude"], clusters["cities"], clusters["reviews"], clusters["avg_rating"]
+        ):
+            rating = "no ratings yet" if pd.isna(avg_rating) else f"avg ⭐ {avg_rating:.2f}"
+            size = 30 + 6 * min(len(str(cities)), 5)
+            folium.Marker(
+                location=[lat, lon],
+                icon=folium.DivIcon(
+                    html=(
+                        f'<div style="width:{size}px;height:{size}px;line-height:{size}px;border-radius:50%;'
+                        f'background:rgba(214,62,42,0.85);color:white;text-align:center;font-weight:bold;">{cities}</div>'
+                    ),
+                    icon_size=(size, size),
+                    icon_anchor=(size // 2, size // 2)
+                ),
+                tooltip=f"{cities} cities · {reviews} reviews · {rating} (zoom in for details)"
+            ).add_to(layer)
+
+    return layer
+
+
+# ---------------- Trivia Map (tab2) ----------------
+def build_trivia_map(df, trivia=None, mode="markers"):
+    trivia_map = folium.Map(location=MAP_CENTER, zoom_start=5, control_scale=True)
+    with_trivia = _with_popup_html(df, trivia).dropna(subset=[TRIVIA_POPUP_COLUMN])
+
+    if mode == "fast":
+        data = _marker_data(with_trivia, [TOOLTIP_COLUMN, TRIVIA_HTML_COLUMN])
+        FastMarkerCluster(data, callback=_TRIVIA_CALLBACK).add_to(trivia_map)
+        return trivia_map
+
+    trivia_cluster = MarkerCluster().add_to(trivia_map)
+
+    for lat, lon, popup_html in zip(with_trivia["Latitude"], with_trivia["Longitude"], with_trivia[TRIVIA_POPUP_COLUMN]):
+        folium.Marker(
+            location=[lat, lon],
+            popup=folium.Popup(popup_html, max_width=250),
+            icon=folium.Icon(color="green", icon="info-sign")
+        ).add_to(trivia_cluster)
+
+    return trivia_map
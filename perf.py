@@ -0,0 +1,249 @@
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Streamlit runs each session's script on its own thread, so events counted on the
+# current thread while a view renders belong to that view's rerun.
+_local = threading.local()
+
+logger = logging.getLogger("heritage.perf")
+
+# Upper bounds (seconds) of the span histogram buckets; the last bucket is +Inf
+SPAN_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Set by configure(); both sinks are off by default
+_settings = {"log_spans": False, "prometheus_path": None, "prometheus_interval": 15.0}
+_last_export = [0.0]
+_export_lock = threading.Lock()
+
+
+def count(event, n=1):
+    """Record ``n`` occurrences of ``event`` (e.g. "db_query", "map_build") for the active view."""
+    counts = getattr(_local, "counts", None)
+    if counts is not None:
+        counts[event] += n
+
+
+# ---------------- Histograms ----------------
+class Histogram:
+    """Fixed-bucket latency histogram plus row/byte/error totals for one span name."""
+
+    def __init__(self, buckets=SPAN_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.errors = 0
+
+    def observe(self, seconds, rows=0, size=0, error=False):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        self.rows += rows
+        self.bytes += size
+        self.errors += bool(error)
+
+    def quantile(self, q):
+        """Estimate the ``q`` quantile by interpolating inside the bucket it falls in."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+
+class PerfRegistry:
+    """Thread-safe map of span name -> ``Histogram``."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds, rows=0, size=0, error=False):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds, rows, size, error)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def summary(self):
+        """One dict per span (count, p50/p95/max in ms, rows, bytes, errors), slowest total first."""
+        with self._lock:
+            items = sorted(self._histograms.items(), key=lambda item: item[1].sum, reverse=True)
+            return [
+                {
+                    "span": name,
+                    "count": h.count,
+                    "total_ms": round(h.sum * 1000, 1),
+                    "p50_ms": round(h.quantile(0.5) * 1000, 2),
+                    "p95_ms": round(h.quantile(0.95) * 1000, 2),
+                    "max_ms": round(h.max * 1000, 2),
+                    "rows": h.rows,
+                    "bytes": h.bytes,
+                    "errors": h.errors,
+                }
+                for name, h in items
+            ]
+
+    def prometheus_text(self, prefix="heritage_span"):
+        """The registry in the Prometheus text exposition format."""
+        def label(name):
+            escaped = name.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            return f'span="{escaped}"'
+
+        with self._lock:
+            items = sorted(self._histograms.items())
+            lines = [
+                f"# HELP {prefix}_seconds Time spent in instrumented spans.",
+                f"# TYPE {prefix}_seconds histogram",
+            ]
+            for name, h in items:
+                cumulative = 0
+                for bound, n in zip(list(h.buckets) + ["+Inf"], h.counts):
+                    cumulative += n
+                    lines.append(f'{prefix}_seconds_bucket{{{label(name)},le="{bound}"}} {cumulative}')
+                lines.append(f"{prefix}_seconds_sum{{{label(name)}}} {h.sum:.6f}")
+                lines.append(f"{prefix}_seconds_count{{{label(name)}}} {h.count}")
+            for metric, attr, help_text in (
+                ("rows_total", "rows", "Rows read or written inside spans."),
+                ("bytes_total", "bytes", "Payload bytes handled inside spans."),
+                ("errors_total", "errors", "Spans that raised."),
+            ):
+                lines.append(f"# HELP {prefix}_{metric} {help_text}")
+                lines.append(f"# TYPE {prefix}_{metric} counter")
+                for name, h in items:
+                    lines.append(f"{prefix}_{metric}{{{label(name)}}} {getattr(h, attr)}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide totals across every session and background thread
+PROCESS = PerfRegistry()
+
+
+# ---------------- Spans ----------------
+def configure(log_spans=False, prometheus_path=None, prometheus_interval=15.0):
+    """Turn on the optional sinks: one JSON log line per span and/or a Prometheus text file."""
+    if log_spans and not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    _settings.update(
+        log_spans=log_spans,
+        prometheus_path=prometheus_path,
+        prometheus_interval=prometheus_interval
+    )
+
+
+@contextmanager
+def span(name, rows=0, size=0):
+    """Time a block as ``name``.
+
+    Yields a dict whose ``rows``/``bytes`` entries the block can fill in once it
+    knows them (e.g. rows fetched). The timing goes to the process-wide registry
+    and, on a thread bound with ``bind_registry``, to that session's registry.
+    """
+    fields = {"rows": rows, "bytes": size}
+    error = False
+    start = time.perf_counter()
+    try:
+        yield fields
+    except BaseException:
+        error = True
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        PROCESS.observe(name, seconds, fields["rows"], fields["bytes"], error)
+        session = getattr(_local, "registry", None)
+        if session is not None:
+            session.observe(name, seconds, fields["rows"], fields["bytes"], error)
+        if _settings["log_spans"]:
+            logger.info(json.dumps({
+                "span": name,
+                "ms": round(seconds * 1000, 3),
+                "rows": fields["rows"],
+                "bytes": fields["bytes"],
+                "error": error,
+                "thread": threading.current_thread().name,
+            }))
+
+
+def timed(name, rows=None):
+    """Decorator form of ``span``; ``rows(result)`` (e.g. ``len``) records the result's row count."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name) as fields:
+                result = fn(*args, **kwargs)
+                if rows is not None:
+                    fields["rows"] = rows(result)
+                return result
+        return wrapper
+    return decorate
+
+
+def export_prometheus(force=False):
+    """Write PROCESS to the configured Prometheus file, at most once per ``prometheus_interval``."""
+    path = _settings["prometheus_path"]
+    if not path:
+        return False
+    with _export_lock:
+        now = time.monotonic()
+        if not force and now - _last_export[0] < _settings["prometheus_interval"]:
+            return False
+        _last_export[0] = now
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(PROCESS.prometheus_text())
+    # Atomic replace so a scraper (node_exporter textfile collector) never reads half a file
+    os.replace(tmp_path, path)
+    return True
+
+
+# ---------------- View Tracking ----------------
+def bind_registry(registry):
+    """Also record spans finished on this thread in ``registry`` (the session's ``PerfRegistry``).
+
+    Called at the top of every rerun, since Streamlit may run a session on a new thread.
+    """
+    _local.registry = registry
+
+
+@contextmanager
+def track_view(view):
+    """Time a view render and collect the events counted on this thread while it runs."""
+    _local.counts = Counter()
+    timing = {"view": view}
+    start = time.perf_counter()
+    try:
+        yield timing
+    finally:
+        timing["seconds"] = time.perf_counter() - start
+        timing["events"] = dict(_local.counts)
+        _local.counts = None
+        name = f"view:{view.strip()}"
+        PROCESS.observe(name, timing["seconds"])
+        session = getattr(_local, "registry", None)
+        if session is not None:
+            session.observe(name, timing["seconds"])
@@ -0,0 +1,167 @@
+from collections import defaultdict
+
+# Per-city aggregate of user_feedback kept up to date by the feedback write path,
+# so the Admin Dashboard never has to scan the raw table.
+ROLLUP_TABLE = "user_feedback_city_rollup"
+
+# Feedback form categories -> rollup column; anything else is counted as "Other"
+CATEGORY_COLUMNS = {
+    "General": "category_general",
+    "Hospitality": "category_hospitality",
+    "Art & Culture": "category_art_culture",
+    "Tourism Tips": "category_tourism_tips",
+    "Other": "category_other",
+}
+RATING_COLUMNS = [f"rating_{stars}" for stars in range(1, 6)]
+COUNTER_COLUMNS = ["total_reviews", "rating_count", "rating_sum"] + RATING_COLUMNS + list(CATEGORY_COLUMNS.values())
+
+# Feedback is stamped in UTC (ISO with offset) when queued. Each backend stores created_on the way its
+# own DEFAULT CURRENT_TIMESTAMP does, so old and new rows order and paginate together: Snowflake as
+# session-time-zone wall time (TIMESTAMP_NTZ), SQLite as UTC text. Naive values are stored as given.
+CREATED_ON_SQL = {
+    "snowflake": "{}::TIMESTAMP_TZ::TIMESTAMP_LTZ::TIMESTAMP_NTZ",
+    "sqlite": "strftime('%Y-%m-%d %H:%M:%f', {})",
+}
+
+ROLLUP_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+        city VARCHAR PRIMARY KEY,
+        {", ".join(f"{column} INTEGER DEFAULT 0" for column in COUNTER_COLUMNS)},
+        last_created_on TIMESTAMP,
+        last_updated TIMESTAMP
+    )
+"""
+
+_MERGE_SQL = f"""
+    MERGE INTO {ROLLUP_TABLE} t
+    USING (
+        SELECT %s AS city, {", ".join(f"%s AS {column}" for column in COUNTER_COLUMNS)},
+               {CREATED_ON_SQL["snowflake"].format("%s")} AS last_created_on
+    ) s
+    ON t.city = s.city
+    WHEN MATCHED THEN UPDATE SET
+        {", ".join(f"{column} = t.{column} + s.{column}" for column in COUNTER_COLUMNS)},
+        last_created_on = GREATEST(COALESCE(t.last_created_on, s.last_created_on), s.last_created_on),
+        last_updated = CURRENT_TIMESTAMP
+    WHEN NOT MATCHED THEN INSERT (city, {", ".join(COUNTER_COLUMNS)}, last_created_on, last_updated)
+        VALUES (s.city, {", ".join(f"s.{column}" for column in COUNTER_COLUMNS)}, s.last_created_on, CURRENT_TIMESTAMP)
+"""
+
+# SQLite has no MERGE; an upsert on the city primary key does the same job
+_UPSERT_SQL = f"""
+    INSERT INTO {ROLLUP_TABLE} (city, {", ".join(COUNTER_COLUMNS)}, last_created_on, last_updated)
+    VALUES (?, {", ".join("?" for _ in COUNTER_COLUMNS)}, {CREATED_ON_SQL["sqlite"].format("?")}, CURRENT_TIMESTAMP)
+    ON CONFLICT (city) DO UPDATE SET
+        {", ".join(f"{column} = {column} + excluded.{column}" for column in COUNTER_COLUMNS)},
+        last_created_on = MAX(COALESCE(last_created_on, excluded.last_created_on), excluded.last_created_on),
+        last_updated = CURRENT_TIMESTAMP
+"""
+
+_DELTA_SQL = {"snowflake": _MERGE_SQL, "sqlite": _UPSERT_SQL}
+
+_named_categories = ", ".join(f"'{category}'" for category in CATEGORY_COLUMNS if category != "Other")
+_CATEGORY_SUMS = [
+    f"SUM(CASE WHEN category = '{category}' THEN 1 ELSE 0 END)"
+    for category in CATEGORY_COLUMNS if category != "Other"
+] + [f"SUM(CASE WHEN category IN ({_named_categories}) THEN 0 ELSE 1 END)"]
+
+_REBUILD_SOURCE = f"""
+    SELECT
+        city,
+        COUNT(*) AS total_reviews,
+        COUNT(rating) AS rating_count,
+        COALESCE(SUM(rating), 0) AS rating_sum,
+        {", ".join(f"SUM(CASE WHEN rating = {stars} THEN 1 ELSE 0 END) AS rating_{stars}" for stars in range(1, 6))},
+        {", ".join(f"{total} AS {column}" for total, column in zip(_CATEGORY_SUMS, CATEGORY_COLUMNS.values()))},
+        MAX(created_on) AS last_created_on
+    FROM user_feedback
+    WHERE city IS NOT NULL
+    GROUP BY city
+"""
+
+# One statement that *sets* each city's counters from the GROUP BY: running it twice (two processes
+# backfilling an empty rollup at once) can't add up or duplicate rows, and there is no gap between a
+# DELETE and an INSERT for a flush's delta to land in and be counted again
+_REBUILD_SQL = {
+    "snowflake": f"""
+        MERGE INTO {ROLLUP_TABLE} t
+        USING ({_REBUILD_SOURCE}) s
+        ON t.city = s.city
+        WHEN MATCHED THEN UPDATE SET
+            {", ".join(f"{column} = s.{column}" for column in COUNTER_COLUMNS)},
+            last_created_on = s.last_created_on,
+            last_updated = CURRENT_TIMESTAMP
+        WHEN NOT MATCHED THEN INSERT (city, {", ".join(COUNTER_COLUMNS)}, last_created_on, last_updated)
+            VALUES (s.city, {", ".join(f"s.{column}" for column in COUNTER_COLUMNS)}, s.last_created_on, CURRENT_TIMESTAMP)
+    """,
+    "sqlite": f"""
+        INSERT INTO {ROLLUP_TABLE} (city, {", ".join(COUNTER_COLUMNS)}, last_created_on, last_updated)
+        SELECT city, {", ".join(COUNTER_COLUMNS)}, last_created_on, CURRENT_TIMESTAMP FROM ({_REBUILD_SOURCE})
+        WHERE true
+        ON CONFLICT (city) DO UPDATE SET
+            {", ".join(f"{column} = excluded.{column}" for column in COUNTER_COLUMNS)},
+            last_created_on = excluded.last_created_on,
+            last_updated = CURRENT_TIMESTAMP
+    """,
+}
+
+# Cities whose feedback has all been deleted since the last rebuild
+_PRUNE_SQL = f"DELETE FROM {ROLLUP_TABLE} WHERE city NOT IN (SELECT city FROM user_feedback WHERE city IS NOT NULL)"
+
+
+def rollup_deltas(rows):
+    """Aggregate queued feedback rows into one MERGE parameter tuple per city.
+
+    ``rows`` are ``(city, name, review, image_urls, rating, category, created_on)``.
+    """
+    deltas = defaultdict(lambda: dict.fromkeys(COUNTER_COLUMNS, 0))
+    latest = {}
+    for city, _, _, _, rating, category, created_on in rows:
+        delta = deltas[city]
+        delta["total_reviews"] += 1
+        if rating is not None:
+            delta["rating_count"] += 1
+            delta["rating_sum"] += int(rating)
+            if 1 <= int(rating) <= 5:
+                delta[f"rating_{int(rating)}"] += 1
+        delta[CATEGORY_COLUMNS.get(category, "category_other")] += 1
+        latest[city] = max(latest.get(city, created_on), created_on)
+    return [
+        (city, *(delta[column] for column in COUNTER_COLUMNS), latest[city])
+        for city, delta in deltas.items()
+    ]
+
+
+def apply_rollup_deltas(cursor, rows, dialect="snowflake"):
+    """Fold a batch of newly inserted feedback rows into the rollup (same transaction as the insert)."""
+    deltas = rollup_deltas(rows)
+    if deltas:
+        cursor.executemany(_DELTA_SQL[dialect], deltas)
+
+
+def rebuild_rollup(cursor, dialect="snowflake"):
+    """Recompute the rollup from the raw table (backfill or repair); idempotent."""
+    cursor.execute(_REBUILD_SQL[dialect])
+    cursor.execute(_PRUNE_SQL)
+
+
+def backfill_rollup(cursor, dialect="snowflake"):
+    """Fill the (already created) rollup from the raw table when it is empty.
+
+    Run the ``ROLLUP_DDL`` first, outside this transaction: Snowflake commits an
+    open transaction on DDL.
+    """
+    cursor.execute(f"SELECT COUNT(*) FROM {ROLLUP_TABLE}")
+    if cursor.fetchone()[0] == 0:
+        rebuild_rollup(cursor, dialect)
+
+
+def fetch_rollup(cursor):
+    cursor.execute(f"""
+        SELECT city, {", ".join(COUNTER_COLUMNS)}, last_created_on, last_updated
+        FROM {ROLLUP_TABLE}
+        ORDER BY total_reviews DESC
+    """)
+    columns = ["city"] + COUNTER_COLUMNS + ["last_created_on", "last_updated"]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
@@ -0,0 +1,103 @@
+import bisect
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Query terms that only match as a prefix of an indexed term count for less than exact hits
+PREFIX_WEIGHT = 0.5
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(str(text).lower()) if text is not None else []
+
+
+class SearchIndex:
+    """In-process inverted index with BM25 ranking and prefix matching.
+
+    Documents can be added at any time (e.g. as feedback is saved); each is a
+    dict with at least ``kind``, ``city`` and ``text``, and ``search`` returns
+    copies of the best-scoring ones with a ``score`` key.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._docs = []
+        self._lengths = []
+        self._total_length = 0
+        self._postings = defaultdict(dict)
+        self._terms = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, kind, city, text, title=None):
+        terms = Counter(tokenize(f"{title or ''} {text}"))
+        with self._lock:
+            doc_id = len(self._docs)
+            self._docs.append({"kind": kind, "city": city, "title": title or city, "text": text})
+            length = sum(terms.values())
+            self._lengths.append(length)
+            self._total_length += length
+            for term, tf in terms.items():
+                if term not in self._postings:
+                    bisect.insort(self._terms, term)
+                self._postings[term][doc_id] = tf
+        return doc_id
+
+    def _expand(self, token):
+        # Exact term plus every indexed term that starts with it, via the sorted vocabulary
+        start = bisect.bisect_left(self._terms, token)
+        expansions = []
+        for term in self._terms[start:]:
+            if not term.startswith(token):
+                break
+            expansions.append((term, 1.0 if term == token else PREFIX_WEIGHT))
+        return expansions
+
+    def search(self, query, limit=10, kinds=None):
+        tokens = set(tokenize(query))
+        if not tokens:
+            return []
+        with self._lock:
+            n_docs = len(self._docs)
+            if n_docs == 0:
+                return []
+            avg_length = self._total_length / n_docs
+            scores = defaultdict(float)
+            for token in tokens:
+                for term, weight in self._expand(token):
+                    postings = self._postings[term]
+                    idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for doc_id, tf in postings.items():
+                        norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_length)
+                        scores[doc_id] += weight * idf * tf * (self.k1 + 1) / (tf + norm)
+            docs = self._docs
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        results = []
+        for doc_id, score in ranked:
+            doc = docs[doc_id]
+            if kinds is not None and doc["kind"] not in kinds:
+                continue
+            results.append({**doc, "score": round(score, 3)})
+            if len(results) == limit:
+                break
+        return results
+
+
+def build_search_index(df, trivia, reviews=()):
+    """Index every city (name, art form, tips), the trivia dict and ``(city, name, review)`` rows."""
+    index = SearchIndex()
+    columns = zip(df["Heritage Cities"], df["Art Forms / Culture"], df["Tourism Tips"].fillna(""))
+    for city, art_form, tips in columns:
+        index.add("city", city, f"{art_form}. {tips}", title=city)
+    for city, fact in trivia.items():
+        index.add("trivia", city, fact, title=f"Did you know? {city}")
+    for city, name, review in reviews:
+        index.add("review", city, review, title=f"{name} on {city}")
+    return index
@@ -0,0 +1,270 @@
+import io
+import json
+import os
+import sqlite3
+import uuid
+
+from db_pool import ConnectionPool
+from perf import span, timed
+from rollup import CREATED_ON_SQL, ROLLUP_DDL, apply_rollup_deltas, backfill_rollup, fetch_rollup, rebuild_rollup
+
+FEEDBACK_BACKENDS = ("snowflake", "sqlite")
+IMAGE_STORES = ("cloudinary", "local")
+
+# SQLITE_BUSY / SQLITE_LOCKED: another connection holds the lock, so the same statement can succeed later
+_SQLITE_TRANSIENT_CODES = (5, 6)
+
+# Queued/inserted feedback rows are (city, name, review, image_urls_json, rating, category, created_on)
+_INSERT_SQL = """
+    INSERT INTO user_feedback (city, name, review, image_urls, rating, category, created_on)
+    VALUES (%s, %s, %s, %s, %s, %s, {created_on})
+"""
+
+_PAGE_SQL = """
+    SELECT id, name, review, image_urls, rating, category, created_on
+    FROM user_feedback
+    WHERE city = %s
+    {keyset}
+    ORDER BY created_on DESC, id DESC
+    LIMIT %s
+"""
+
+_RECENT_REVIEWS_SQL = "SELECT city, name, review FROM user_feedback ORDER BY created_on DESC LIMIT %s"
+
+
+# ---------------- Feedback Stores ----------------
+class FeedbackStore:
+    """Feedback persistence used by the app: batch insert, per-city pages and the city rollup.
+
+    Subclasses provide the connection pool and SQL dialect; queries are written
+    with ``%s`` placeholders and translated for drivers that use ``?``.
+    """
+
+    dialect = None
+    placeholder = "%s"
+    begin = "BEGIN"
+    # Backend tables created before the rollup (the Snowflake feedback table is provisioned separately)
+    SCHEMA = []
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def sql(self, statement):
+        return statement if self.placeholder == "%s" else statement.replace("%s", self.placeholder)
+
+    def ensure_schema(self):
+        """Create the rollup table (and anything else the backend needs), backfilling if empty."""
+        with self.pool.cursor(commit=True) as cursor:
+            # DDL runs before the transaction, since Snowflake commits an open one on DDL
+            for statement in self.SCHEMA + [ROLLUP_DDL]:
+                cursor.execute(statement)
+            cursor.execute(self.begin)
+            backfill_rollup(cursor, self.dialect)
+
+    def insert_feedback(self, rows):
+        # executemany becomes a multi-row INSERT; the rollup moves in the same transaction
+        size = sum(len(row[2] or "") + len(row[3] or "") for row in rows)
+        with span("db.insert_feedback", rows=len(rows), size=size):
+            with self.pool.cursor(commit=True) as cursor:
+                cursor.execute(self.begin)
+                insert_sql = _INSERT_SQL.format(created_on=CREATED_ON_SQL[self.dialect].format("%s"))
+                cursor.executemany(self.sql(insert_sql), rows)
+                apply_rollup_deltas(cursor, rows, dialect=self.dialect)
+
+    @timed("db.fetch_feedback_page", rows=len)
+    def fetch_feedback_page(self, city, limit, after=None):
+        """Rows for ``city`` newest first, strictly after the ``(created_on, id)`` keyset ``after``."""
+        if after is None:
+            statement = _PAGE_SQL.format(keyset="")
+            params = (city, limit)
+        else:
+            after_created_on, after_id = after
+            statement = _PAGE_SQL.format(keyset="AND (created_on < %s OR (created_on = %s AND id < %s))")
+            params = (city, after_created_on, after_created_on, after_id, limit)
+
+        def fetch(cursor):
+            cursor.execute(self.sql(statement), params)
+            return cursor.fetchall()
+
+        return self.pool.run(fetch)
+
+    @timed("feedback.page", rows=lambda page: len(page[0]))
+    def fetch_feedback(self, city, page_size, after=None):
+        """One decoded review page for ``city`` plus the keyset of the next page (``None`` if last)."""
+        # One extra row tells us whether another page exists without a COUNT(*)
+        rows = self.fetch_feedback_page(city, page_size + 1, after)
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        feedback_list = []
+        for feedback_id, name, review, image_urls_str, rating, category, created_on in rows:
+            try:
+                images = json.loads(image_urls_str) if image_urls_str else []
+            except Exception:
+                images = []
+            feedback_list.append({
+                "name": name,
+                "review": review,
+                "images": images,
+                "rating": rating,
+                "category": category
+            })
+        next_after = (rows[-1][6], rows[-1][0]) if has_more else None
+        return feedback_list, next_after
+
+    @timed("db.fetch_recent_reviews", rows=len)
+    def fetch_recent_reviews(self, limit, batch_size=1000):
+        def fetch(cursor):
+            cursor.execute(self.sql(_RECENT_REVIEWS_SQL), (limit,))
+            rows = []
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    return rows
+                rows.extend(batch)
+
+        return self.pool.run(fetch)
+
+    @timed("db.fetch_city_rollup", rows=len)
+    def fetch_city_rollup(self):
+        return self.pool.run(fetch_rollup)
+
+    @timed("db.rebuild_rollup")
+    def rebuild_rollup(self):
+        with self.pool.cursor(commit=True) as cursor:
+            cursor.execute(self.begin)
+            rebuild_rollup(cursor, self.dialect)
+
+
+class SnowflakeFeedbackStore(FeedbackStore):
+    """The production backend: ``user_feedback`` in Snowflake (see README for the schema)."""
+
+    dialect = "snowflake"
+
+    def __init__(self, pool_size=4, max_retries=3, query_timeout=30):
+        import snowflake.connector
+        import snowflake.connector.errors
+
+        def connect():
+            return snowflake.connector.connect(
+                user=os.getenv("SNOWFLAKE_USER"),
+                password=os.getenv("SNOWFLAKE_PASSWORD"),
+                account=os.getenv("SNOWFLAKE_ACCOUNT"),
+                warehouse=os.getenv("SNOWFLAKE_WAREHOUSE"),
+                database=os.getenv("SNOWFLAKE_DATABASE"),
+                schema=os.getenv("SNOWFLAKE_SCHEMA"),
+                session_parameters={"STATEMENT_TIMEOUT_IN_SECONDS": query_timeout}
+            )
+
+        super().__init__(ConnectionPool(
+            connect,
+            size=pool_size,
+            max_retries=max_retries,
+            retry_on=(snowflake.connector.errors.OperationalError, snowflake.connector.errors.InterfaceError)
+        ))
+
+
+def _is_sqlite_transient(exc):
+    # Everything else sqlite3 calls an OperationalError ("no such table", syntax errors) fails the same way on retry
+    code = getattr(exc, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in _SQLITE_TRANSIENT_CODES
+    return "locked" in str(exc) or "busy" in str(exc)
+
+
+class SQLiteFeedbackStore(FeedbackStore):
+    """Local single-file backend for development, offline runs and load tests."""
+
+    dialect = "sqlite"
+    placeholder = "?"
+    # Take the write lock up front: a read-then-write transaction can't wait for another writer
+    begin = "BEGIN IMMEDIATE"
+
+    SCHEMA = [
+        """
+        CREATE TABLE IF NOT EXISTS user_feedback (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            city TEXT,
+            name TEXT,
+            review TEXT,
+            image_urls TEXT,
+            rating INTEGER,
+            category TEXT,
+            created_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        # Serves the per-city keyset pages without scanning other cities
+        "CREATE INDEX IF NOT EXISTS idx_user_feedback_city_created ON user_feedback (city, created_on, id)",
+    ]
+
+    def __init__(self, path, pool_size=4, max_retries=3, query_timeout=30):
+        def connect():
+            # Autocommit mode, so transactions are the explicit BEGIN/commit pairs used by FeedbackStore
+            conn = sqlite3.connect(path, timeout=query_timeout, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            return conn
+
+        super().__init__(ConnectionPool(
+            connect,
+            size=pool_size,
+            max_retries=max_retries,
+            retry_on=(sqlite3.OperationalError,),
+            retry_if=_is_sqlite_transient
+        ))
+
+
+def create_feedback_store(backend, sqlite_path=None, **pool_settings):
+    if backend == "snowflake":
+        return SnowflakeFeedbackStore(**pool_settings)
+    if backend == "sqlite":
+        return SQLiteFeedbackStore(sqlite_path, **pool_settings)
+    raise ValueError(f"Unknown feedback backend: {backend!r} (expected one of {FEEDBACK_BACKENDS})")
+
+
+# ---------------- Image Stores ----------------
+class CloudinaryImageStore:
+    def __init__(self):
+        import cloudinary
+        import cloudinary.uploader
+
+        cloudinary.config(
+            cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
+            api_key=os.getenv("CLOUDINARY_API_KEY"),
+            api_secret=os.getenv("CLOUDINARY_API_SECRET"),
+            secure=True
+        )
+        self._upload = cloudinary.uploader.upload
+
+    def uploader(self, folder):
+        def upload(data, filename, timeout):
+            result = self._upload(io.BytesIO(data), folder=folder, timeout=timeout)
+            return result["secure_url"]
+        return upload
+
+
+class LocalImageStore:
+    """Writes uploads under ``root`` and returns their file paths (which ``st.image`` can show)."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def uploader(self, folder):
+        target_dir = os.path.join(self.root, folder)
+
+        def upload(data, filename, timeout):
+            os.makedirs(target_dir, exist_ok=True)
+            # Downscaled uploads are JPEG; undecodable originals keep their own extension
+            extension = ".jpg" if data[:2] == b"\xff\xd8" else os.path.splitext(filename)[1].lower()
+            path = os.path.join(target_dir, f"{uuid.uuid4().hex}{extension}")
+            with open(path, "wb") as f:
+                f.write(data)
+            return path
+        return upload
+
+
+def create_image_store(kind, local_root=None):
+    if kind == "cloudinary":
+        return CloudinaryImageStore()
+    if kind == "local":
+        return LocalImageStore(local_root)
+    raise ValueError(f"Unknown image store: {kind!r} (expected one of {IMAGE_STORES})")
@@ -0,0 +1,74 @@
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from PIL import Image, ImageOps
+
+from perf import span
+
+
+# ---------------- Image Downscaling ----------------
+def downscale_image(data, max_edge=1600, quality=85):
+    """Re-encode image bytes as a JPEG whose longest edge is at most ``max_edge``."""
+    with Image.open(io.BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode in ("RGBA", "LA", "P"):
+            img = img.convert("RGBA")
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel("A"))
+            img = background
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+        img.thumbnail((max_edge, max_edge))
+        out = io.BytesIO()
+        img.save(out, format="JPEG", quality=quality, optimize=True)
+    return out.getvalue()
+
+
+def _prepare_and_upload(upload, name, data, max_edge, quality, timeout):
+    try:
+        data = downscale_image(data, max_edge=max_edge, quality=quality)
+    except Exception:
+        # Not decodable by Pillow: ship the original and let the image host decide
+        pass
+    with span("upload.file", rows=1, size=len(data)):
+        return upload(data, name, timeout)
+
+
+# ---------------- Parallel Uploads ----------------
+def upload_images(files, upload, max_edge=1600, quality=85, max_workers=4, timeout=30):
+    """Downscale and upload ``(name, bytes)`` pairs concurrently.
+
+    ``upload(data, name, timeout)`` must return the hosted URL; pass a stub to
+    run without Cloudinary. Files go out in waves of ``max_workers`` and each
+    wave gets ``timeout`` seconds. Returns ``(urls, failures)`` where ``urls`` keeps the
+    input order of the successful files and ``failures`` lists ``(name, error)``.
+    """
+    files = list(files)
+    if not files:
+        return [], []
+
+    # Wall time of the whole batch; each file's upload is also its own "upload.file" span
+    with span("upload.batch", rows=len(files), size=sum(len(data) for _, data in files)):
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = [
+                executor.submit(_prepare_and_upload, upload, name, data, max_edge, quality, timeout)
+                for name, data in files
+            ]
+            started = time.monotonic()
+            urls, failures = [], []
+            for position, ((name, _), future) in enumerate(zip(files, futures)):
+                deadline = started + timeout * (position // max_workers + 1)
+                try:
+                    urls.append(future.result(timeout=max(0, deadline - time.monotonic())))
+                except FutureTimeoutError:
+                    future.cancel()
+                    failures.append((name, f"timed out after {timeout}s"))
+                except Exception as e:
+                    failures.append((name, e))
+            return urls, failures
+        finally:
+            # Don't block the rerun on uploads that already timed out
+            executor.shutdown(wait=False, cancel_futures=True)